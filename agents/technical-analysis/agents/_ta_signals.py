@@ -0,0 +1,150 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+HAS_SMA = 1
+HAS_RSI = 2
+HAS_MACD = 4
+HAS_BB = 8
+ALL_INDICATORS = HAS_SMA | HAS_RSI | HAS_MACD | HAS_BB
+
+# Layout of the value row handed to aggregate_signals; missing entries are NaN.
+(
+    V_CLOSE, V_CLOSE_2, V_CLOSE_5,
+    V_SMA20, V_PREV_SMA20, V_SMA50, V_PREV_SMA50,
+    V_RSI14,
+    V_MACD, V_PREV_MACD, V_MACD_SIGNAL, V_PREV_MACD_SIGNAL,
+    V_BB_LOW, V_BB_HIGH
+) = range(14)
+NUM_VALUES = 14
+
+# Each technical rule is an if/elif ladder of up to six conditions plus a
+# default. Row r of the tables holds the (action code, confidence) for each
+# rung of rule r, with the default in the last column; codes index ACTIONS.
+RULE_SMA, RULE_TREND, RULE_RSI, RULE_MACD, RULE_BB, RULE_MOMENTUM, RULE_FALLBACK = range(7)
+MAX_CONDITIONS = 6
+BUY, SELL, HOLD = range(3)
+RULE_LADDERS = (
+    ((BUY, 0.75), (SELL, 0.75), (BUY, 0.6), (SELL, 0.6), (BUY, 0.55), (SELL, 0.55)),
+    ((BUY, 0.55), (SELL, 0.55)),
+    ((BUY, 0.7), (BUY, 0.6), (BUY, 0.55), (SELL, 0.7), (SELL, 0.6), (SELL, 0.55), (HOLD, 0.5)),
+    ((BUY, 0.75), (SELL, 0.75), (BUY, 0.65), (SELL, 0.65), (BUY, 0.55), (SELL, 0.55), (HOLD, 0.5)),
+    ((BUY, 0.7), (SELL, 0.7), (BUY, 0.6), (SELL, 0.6), (BUY, 0.55), (SELL, 0.55), (HOLD, 0.5)),
+    ((BUY, 0.65), (SELL, 0.65), (BUY, 0.55), (SELL, 0.55), (HOLD, 0.5)),
+    ((BUY, 0.55), (SELL, 0.55))
+)
+NUM_RULES = len(RULE_LADDERS)
+RULE_CODES = np.full((NUM_RULES, MAX_CONDITIONS + 1), HOLD, dtype=np.int8)
+RULE_CONFIDENCES = np.full((NUM_RULES, MAX_CONDITIONS + 1), 0.5)
+for _rule, _ladder in enumerate(RULE_LADDERS):
+    for _rung, (_code, _confidence) in enumerate(_ladder[:-1]):
+        RULE_CODES[_rule, _rung] = _code
+        RULE_CONFIDENCES[_rule, _rung] = _confidence
+    RULE_CODES[_rule, -1], RULE_CONFIDENCES[_rule, -1] = _ladder[-1]
+
+
+# error_model='numpy' keeps x / 0 as inf/NaN like the NumPy version did; no
+# fastmath because NaN indicators must keep failing every comparison.
+@njit(cache=True, error_model='numpy')
+def aggregate_signals(values, col_mask, num_rows):
+    close = values[V_CLOSE]
+    has_prev = num_rows > 2
+    price_change = close / values[V_CLOSE_5] - 1 if num_rows > 5 else np.nan
+
+    conditions = np.zeros((NUM_RULES, MAX_CONDITIONS), dtype=np.bool_)
+    valid = np.zeros(NUM_RULES, dtype=np.bool_)
+    num_valid = 0
+
+    if col_mask & HAS_SMA:
+        sma20 = values[V_SMA20]
+        sma50 = values[V_SMA50]
+        conditions[RULE_SMA, 0] = has_prev and sma20 > sma50 and values[V_PREV_SMA20] <= values[V_PREV_SMA50]
+        conditions[RULE_SMA, 1] = has_prev and sma20 < sma50 and values[V_PREV_SMA20] >= values[V_PREV_SMA50]
+        conditions[RULE_SMA, 2] = close > sma50 and sma20 > sma50
+        conditions[RULE_SMA, 3] = close < sma50 and sma20 < sma50
+        conditions[RULE_SMA, 4] = close > sma20
+        valid[RULE_SMA] = True
+        num_valid += 1
+    elif num_rows > 5:
+        conditions[RULE_TREND, 0] = price_change > 0
+        valid[RULE_TREND] = True
+        num_valid += 1
+
+    if col_mask & HAS_RSI:
+        rsi = values[V_RSI14]
+        conditions[RULE_RSI, 0] = rsi < 30
+        conditions[RULE_RSI, 1] = rsi < 40
+        conditions[RULE_RSI, 2] = rsi < 45
+        conditions[RULE_RSI, 3] = rsi > 70
+        conditions[RULE_RSI, 4] = rsi > 60
+        conditions[RULE_RSI, 5] = rsi > 55
+        valid[RULE_RSI] = True
+        num_valid += 1
+
+    if col_mask & HAS_MACD:
+        macd = values[V_MACD]
+        macd_signal = values[V_MACD_SIGNAL]
+        conditions[RULE_MACD, 0] = has_prev and macd > macd_signal and values[V_PREV_MACD] <= values[V_PREV_MACD_SIGNAL]
+        conditions[RULE_MACD, 1] = has_prev and macd < macd_signal and values[V_PREV_MACD] >= values[V_PREV_MACD_SIGNAL]
+        conditions[RULE_MACD, 2] = macd > macd_signal and macd > 0
+        conditions[RULE_MACD, 3] = macd < macd_signal and macd < 0
+        conditions[RULE_MACD, 4] = macd > macd_signal
+        conditions[RULE_MACD, 5] = macd < macd_signal
+        valid[RULE_MACD] = True
+        num_valid += 1
+
+    if col_mask & HAS_BB:
+        bb_low = values[V_BB_LOW]
+        bb_high = values[V_BB_HIGH]
+        bb_pct = (close - bb_low) / (bb_high - bb_low)
+        conditions[RULE_BB, 0] = close < bb_low
+        conditions[RULE_BB, 1] = close > bb_high
+        conditions[RULE_BB, 2] = bb_pct < 0.3
+        conditions[RULE_BB, 3] = bb_pct > 0.7
+        conditions[RULE_BB, 4] = bb_pct < 0.4
+        conditions[RULE_BB, 5] = bb_pct > 0.6
+        valid[RULE_BB] = True
+        num_valid += 1
+
+    if num_rows >= 5:
+        conditions[RULE_MOMENTUM, 0] = price_change > 0.03
+        conditions[RULE_MOMENTUM, 1] = price_change < -0.03
+        conditions[RULE_MOMENTUM, 2] = price_change > 0.01
+        conditions[RULE_MOMENTUM, 3] = price_change < -0.01
+        valid[RULE_MOMENTUM] = True
+        num_valid += 1
+
+    if num_rows >= 3 and num_valid < 3:
+        conditions[RULE_FALLBACK, 0] = close > values[V_CLOSE_2]
+        valid[RULE_FALLBACK] = True
+
+    counts = np.zeros(3, dtype=np.int64)
+    totals = np.zeros(3)
+    for rule in range(NUM_RULES):
+        if not valid[rule]:
+            continue
+        rung = MAX_CONDITIONS
+        for k in range(MAX_CONDITIONS):
+            if conditions[rule, k]:
+                rung = k
+                break
+        code = RULE_CODES[rule, rung]
+        counts[code] += 1
+        totals[code] += RULE_CONFIDENCES[rule, rung]
+
+    winner = 0
+    for code in range(1, 3):
+        if counts[code] > counts[winner]:
+            winner = code
+    if counts[winner] == 0:
+        return winner, 0.5
+    return winner, totals[winner] / counts[winner]
+
+
+aggregate_signals(np.full(NUM_VALUES, np.nan), ALL_INDICATORS, 0)
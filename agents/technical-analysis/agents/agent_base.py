@@ -1,10 +1,98 @@
 import os
 import json
+import atexit
+import threading
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, NamedTuple, Tuple, Optional, Iterator, Callable
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class _StateWriter:
+    # Writes state snapshots on a background thread. Only the newest snapshot
+    # per file is kept, so bursts of saves collapse into a single write.
+    # on_written(path, error) runs on the writer thread after each write.
+    
+    def __init__(self):
+        self._pending: Dict[str, Tuple[bytes, Callable[[str, Optional[Exception]], None]]] = {}
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = None
+    
+    def submit(self, path: str, data: bytes, on_written: Callable[[str, Optional[Exception]], None]) -> None:
+        with self._cond:
+            self._pending[path] = (data, on_written)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+    
+    def flush(self) -> None:
+        with self._cond:
+            while self._pending or self._busy:
+                self._cond.wait()
+    
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                pending, self._pending = self._pending, {}
+                self._busy = True
+            
+            for path, (data, on_written) in pending.items():
+                tmp_path = path + ".tmp"
+                error = None
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                except Exception as e:
+                    error = e
+                on_written(path, error)
+            
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+
+_STATE_WRITER = _StateWriter()
+
+
+def flush_state_writes() -> None:
+    _STATE_WRITER.flush()
+
+
+atexit.register(flush_state_writes)
+
+
+class TradeResult(NamedTuple):
+    ticker: str
+    action: str
+    confidence: float
+    price: float
+    quantity: float
+    value: float
+    status: str
+    message: Optional[str] = None
+    
+    @classmethod
+    def error(cls, ticker: str, action: str, confidence: float, price: float, message: str) -> "TradeResult":
+        return cls(ticker, action, confidence, price, 0, 0, "error", message)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        if self.status == "error":
+            return {"status": "error", "message": self.message}
+        result = self._asdict()
+        del result["message"]
+        return result
+
+
 class AgentBase:
     
     def __init__(self, 
@@ -17,6 +105,9 @@ class AgentBase:
         self.models_dir = models_dir
         self.log_dir = log_dir
         self.history = []
+        self.verbose = False
+        self._state_dirty = False
+        self._action_batch: Optional[List[Dict[str, Any]]] = None
         
         os.makedirs(models_dir, exist_ok=True)
         os.makedirs(log_dir, exist_ok=True)
@@ -37,6 +128,7 @@ class AgentBase:
     
     def _load_state(self) -> None:
         state_file = os.path.join(self.log_dir, self.agent_id, "state.json")
+        _STATE_WRITER.flush()
         
         if os.path.exists(state_file):
             try:
@@ -51,49 +143,98 @@ class AgentBase:
         state_file = os.path.join(self.log_dir, self.agent_id, "state.json")
         
         try:
-            with open(state_file, 'w') as f:
-                json.dump(self.state, f, indent=2, default=str)
-            print(f"Saved agent state to {state_file}")
+            if orjson is not None:
+                data = orjson.dumps(
+                    self.state,
+                    default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                )
+            else:
+                data = json.dumps(self.state, indent=2, default=str).encode()
         except Exception as e:
-            print(f"Error saving state file: {e}")
+            print(f"Error saving state file {state_file}: {e}")
+            return
+        
+        self._state_dirty = False
+        _STATE_WRITER.submit(state_file, data, self._state_written)
+    
+    def _state_written(self, state_file: str, error: Optional[Exception]) -> None:
+        if error is not None:
+            # Dirty again so the next save retries instead of dropping this state
+            self._state_dirty = True
+            print(f"Error saving state file {state_file}: {error}")
+        elif self.verbose:
+            print(f"Saved agent state to {state_file}")
     
     def _log_action(self, action: Dict[str, Any]) -> None:
-        action["timestamp"] = datetime.now().isoformat()
+        self._log_actions([action])
+    
+    def _log_actions(self, actions: List[Dict[str, Any]]) -> None:
+        if self._action_batch is not None:
+            self._action_batch.extend(actions)
+            return
+        
+        now = datetime.now()
+        timestamp = now.isoformat()
+        for action in actions:
+            action["timestamp"] = timestamp
         
-        self.history.append(action)
+        self.history.extend(actions)
         
         log_file = os.path.join(
             self.log_dir, self.agent_id, 
-            f"actions_{datetime.now().strftime('%Y%m%d')}.jsonl"
+            f"actions_{now.strftime('%Y%m%d')}.jsonl"
         )
         
         try:
             with open(log_file, 'a') as f:
-                f.write(json.dumps(action, default=str) + "\n")
+                f.write("".join(json.dumps(action, default=str) + "\n" for action in actions))
         except Exception as e:
             print(f"Error logging action: {e}")
     
+    @contextmanager
+    def batched_trades(self) -> Iterator[None]:
+        # Trades inside the block apply to state immediately but their log
+        # entries and the state snapshot are written once on exit.
+        if self._action_batch is not None:
+            yield
+            return
+        
+        self._action_batch = []
+        try:
+            yield
+        finally:
+            actions, self._action_batch = self._action_batch, None
+            if actions:
+                self._log_actions(actions)
+            if self._state_dirty:
+                self._save_state()
+    
     def get_status(self) -> Dict[str, Any]:
         return self.state
     
-    def get_history(self, days: int = 7) -> List[Dict[str, Any]]:
+    def iter_history(self, days: int = 7) -> Iterator[Dict[str, Any]]:
         start_date = datetime.now() - timedelta(days=days)
         
-        filtered_history = []
         for action in self.history:
             action_date = datetime.fromisoformat(action["timestamp"])
             if action_date >= start_date:
-                filtered_history.append(action)
-        
-        return filtered_history
+                yield action
     
-    def update_portfolio_value(self, prices: Dict[str, float]) -> float:
+    def get_history(self, days: int = 7) -> List[Dict[str, Any]]:
+        return list(self.iter_history(days))
+    
+    def _portfolio_value(self, prices: Dict[str, float]) -> float:
         portfolio_value = self.state["cash"]
         
         for ticker, position in self.state["positions"].items():
             if ticker in prices:
                 portfolio_value += position["shares"] * prices[ticker]
         
+        return portfolio_value
+    
+    def update_portfolio_value(self, prices: Dict[str, float]) -> float:
+        portfolio_value = self._portfolio_value(prices)
         self.state["portfolio_value"] = portfolio_value
         
         today = datetime.now().strftime("%Y-%m-%d")
@@ -112,17 +253,10 @@ class AgentBase:
                       confidence: float,
                       price: float,
                       quantity: Optional[float] = None,
-                      allocation: Optional[float] = None) -> Dict[str, Any]:
+                      allocation: Optional[float] = None,
+                      autosave: bool = True) -> TradeResult:
         if action == 'hold':
-            trade_result = {
-                "ticker": ticker,
-                "action": "hold",
-                "confidence": confidence,
-                "price": price,
-                "quantity": 0,
-                "value": 0,
-                "status": "success"
-            }
+            trade_result = TradeResult(ticker, "hold", confidence, price, 0, 0, "success")
             self._log_action({
                 "type": "trade",
                 "ticker": ticker,
@@ -134,23 +268,14 @@ class AgentBase:
         
         try:
             if action not in ['buy', 'sell']:
-                return {
-                    "status": "error",
-                    "message": f"Invalid action: {action}"
-                }
+                return TradeResult.error(ticker, action, confidence, price, f"Invalid action: {action}")
             
             if quantity is None and allocation is None:
-                return {
-                    "status": "error",
-                    "message": "Either quantity or allocation must be specified"
-                }
+                return TradeResult.error(ticker, action, confidence, price, "Either quantity or allocation must be specified")
             
             if quantity is None:
                 if allocation <= 0 or allocation > 1:
-                    return {
-                        "status": "error",
-                        "message": f"Invalid allocation: {allocation}"
-                    }
+                    return TradeResult.error(ticker, action, confidence, price, f"Invalid allocation: {allocation}")
                 
                 portfolio_value = self.state["portfolio_value"]
                 trade_value = portfolio_value * allocation
@@ -160,10 +285,7 @@ class AgentBase:
                 trade_value = price * quantity
                 
                 if trade_value > self.state["cash"]:
-                    return {
-                        "status": "error",
-                        "message": f"Insufficient funds: {self.state['cash']} < {trade_value}"
-                    }
+                    return TradeResult.error(ticker, action, confidence, price, f"Insufficient funds: {self.state['cash']} < {trade_value}")
                 
                 if ticker not in self.state["positions"]:
                     self.state["positions"][ticker] = {
@@ -182,18 +304,12 @@ class AgentBase:
                 
             elif action == 'sell':
                 if ticker not in self.state["positions"]:
-                    return {
-                        "status": "error",
-                        "message": f"No position in {ticker}"
-                    }
+                    return TradeResult.error(ticker, action, confidence, price, f"No position in {ticker}")
                 
                 position = self.state["positions"][ticker]
                 
                 if quantity > position["shares"]:
-                    return {
-                        "status": "error",
-                        "message": f"Insufficient shares: {position['shares']} < {quantity}"
-                    }
+                    return TradeResult.error(ticker, action, confidence, price, f"Insufficient shares: {position['shares']} < {quantity}")
                 
                 trade_value = price * quantity
                 
@@ -204,17 +320,11 @@ class AgentBase:
                 
                 self.state["cash"] += trade_value
             
-            self._save_state()
+            self._state_dirty = True
+            if autosave:
+                self._save_state()
             
-            trade_result = {
-                "ticker": ticker,
-                "action": action,
-                "confidence": confidence,
-                "price": price,
-                "quantity": quantity,
-                "value": price * quantity,
-                "status": "success"
-            }
+            trade_result = TradeResult(ticker, action, confidence, price, quantity, price * quantity, "success")
             
             self._log_action({
                 "type": "trade",
@@ -238,10 +348,26 @@ class AgentBase:
                 "error": error_msg
             })
             
-            return {
-                "status": "error",
-                "message": error_msg
-            }
+            return TradeResult.error(ticker, action, confidence, price, error_msg)
+    
+    def execute_holds(self, holds: List[Tuple[str, float, float]]) -> Dict[str, TradeResult]:
+        if not holds:
+            return {}
+        
+        trade_results = {}
+        actions = []
+        for ticker, confidence, price in holds:
+            trade_results[ticker] = TradeResult(ticker, "hold", confidence, price, 0, 0, "success")
+            actions.append({
+                "type": "trade",
+                "ticker": ticker,
+                "action": "hold",
+                "confidence": confidence,
+                "price": price
+            })
+        self._log_actions(actions)
+        
+        return trade_results
     
     def analyze(self, data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         raise NotImplementedError("Subclasses must implement analyze()")
@@ -1,234 +1,589 @@
 import os
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Mapping, Callable
+from types import MappingProxyType
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import sys
 import importlib.util
 import time
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from agents.agent_base import AgentBase
-from data.data_loader import DataLoader
-from models.lstm_model import LSTMModel
-from models.transformer_model import TransformerModel
+from agents.agent_base import AgentBase, TradeResult, flush_state_writes
+from agents._ta_signals import (
+    HAS_SMA, HAS_RSI, HAS_MACD, HAS_BB, ALL_INDICATORS, NUM_VALUES, aggregate_signals,
+    V_CLOSE, V_CLOSE_2, V_CLOSE_5, V_SMA20, V_PREV_SMA20, V_SMA50, V_PREV_SMA50, V_RSI14,
+    V_MACD, V_PREV_MACD, V_MACD_SIGNAL, V_PREV_MACD_SIGNAL, V_BB_LOW, V_BB_HIGH
+)
+from data.data_loader import DataLoader, trim_to_period
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('buy', 'sell', 'hold')
+
+ANALYSIS_COLUMNS = ['Close', 'sma20', 'sma50', 'rsi14', 'macd', 'macd_signal', 'bb_low', 'bb_high']
+PROXY_COLUMNS = ['Close', 'sma50', 'rsi14']
+
+QUANTIZED_MODEL_FILE = "model_int8.tflite"
+TREND_PERIODS = (5, 10, 20)
+ANALYSIS_PERIOD = "60d"
+WORKER_THREADS = min(8, os.cpu_count() or 1)
+
+# ticker -> ((last bar timestamp, last close), personality-independent predictions)
+_ANALYSIS_CACHE: Dict[str, Tuple[Tuple[Any, float], Dict[str, Any]]] = {}
+
+_COMMON_CONFIG = {
+    "lookback_window": 30,
+    "prediction_threshold": 0.52,
+    "position_sizing": 0.1,
+    "max_position": 0.25,
+    "stop_loss": 0.05,
+    "take_profit": 0.10,
+    "use_stop_loss": True,
+    "use_take_profit": True
+}
+
+_PERSONALITY_OVERRIDES = {
+    "conservative": {
+        "prediction_threshold": 0.55,
+        "position_sizing": 0.05,
+        "max_position": 0.15,
+        "stop_loss": 0.03,
+        "take_profit": 0.07,
+        "confidence_weight": {
+            "lstm": 0.35,
+            "transformer": 0.35,
+            "technicals": 0.3
+        }
+    },
+    "balanced": {
+        "prediction_threshold": 0.52,
+        "confidence_weight": {
+            "lstm": 0.45,
+            "transformer": 0.45,
+            "technicals": 0.1
+        }
+    },
+    "aggressive": {
+        "prediction_threshold": 0.51,
+        "position_sizing": 0.15,
+        "max_position": 0.35,
+        "stop_loss": 0.07,
+        "take_profit": 0.15,
+        "confidence_weight": {
+            "lstm": 0.5, 
+            "transformer": 0.5,
+            "technicals": 0.0
+        }
+    },
+    "trend": {
+        "prediction_threshold": 0.53,
+        "position_sizing": 0.12,
+        "confidence_weight": {
+            "lstm": 0.25,
+            "transformer": 0.25,
+            "technicals": 0.5
+        }
+    }
+}
+
+
+@dataclass(frozen=True)
+class PersonalityConfig:
+    lookback_window: int
+    prediction_threshold: float
+    position_sizing: float
+    max_position: float
+    stop_loss: float
+    take_profit: float
+    use_stop_loss: bool
+    use_take_profit: bool
+    w_lstm: float
+    w_transformer: float
+    w_technicals: float
+    
+    @classmethod
+    def from_overrides(cls, overrides: Dict[str, Any]) -> "PersonalityConfig":
+        config = {**_COMMON_CONFIG, **overrides}
+        weights = config.pop("confidence_weight")
+        return cls(
+            w_lstm=weights["lstm"],
+            w_transformer=weights["transformer"],
+            w_technicals=weights["technicals"],
+            **config
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lookback_window": self.lookback_window,
+            "prediction_threshold": self.prediction_threshold,
+            "position_sizing": self.position_sizing,
+            "max_position": self.max_position,
+            "stop_loss": self.stop_loss,
+            "take_profit": self.take_profit,
+            "use_stop_loss": self.use_stop_loss,
+            "use_take_profit": self.use_take_profit,
+            "confidence_weight": {
+                "lstm": self.w_lstm,
+                "transformer": self.w_transformer,
+                "technicals": self.w_technicals
+            }
+        }
+
+
+_PERSONALITY_CONFIGS: Mapping[str, PersonalityConfig] = MappingProxyType({
+    personality: PersonalityConfig.from_overrides(overrides)
+    for personality, overrides in _PERSONALITY_OVERRIDES.items()
+})
+
+
+# Feature rows are (short trend, medium trend, long trend, price / sma50 - 1, rsi14).
+# Clamps are written as explicit comparisons so NaN trends fall to the lower
+# bound exactly as the builtin min(hi, max(lo, x)) does; no fastmath for the
+# same reason.
+@njit(cache=True)
+def _proxy_predictions(features):
+    num_rows = features.shape[0]
+    lstm_preds = np.empty(num_rows)
+    transformer_preds = np.empty(num_rows)
+    
+    for k in range(num_rows):
+        short_trend = features[k, 0]
+        medium_trend = features[k, 1]
+        long_trend = features[k, 2]
+        price_to_sma50 = features[k, 3]
+        rsi = features[k, 4]
+        
+        lstm_direction = (short_trend * 0.6) + (medium_trend * 0.4)
+        lstm_offset = -0.45
+        if lstm_direction * 5 > lstm_offset:
+            lstm_offset = lstm_direction * 5
+        if lstm_offset > 0.45:
+            lstm_offset = 0.45
+        
+        transformer_direction = long_trend * 0.4 + price_to_sma50 * 0.3
+        if rsi > 70:
+            transformer_direction -= 0.05
+        elif rsi < 30:
+            transformer_direction += 0.05
+        transformer_offset = -0.48
+        if transformer_direction * 5 > transformer_offset:
+            transformer_offset = transformer_direction * 5
+        if transformer_offset > 0.48:
+            transformer_offset = 0.48
+        
+        lstm_preds[k] = 0.5 + lstm_offset
+        transformer_preds[k] = 0.5 + transformer_offset
+    
+    return lstm_preds, transformer_preds
+
+
+_proxy_predictions(np.zeros((1, 5)))
+
+
+def _entry_names(path: Path) -> set:
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
+def trailing_returns(close: np.ndarray, periods: Tuple[int, ...] = TREND_PERIODS) -> List[float]:
+    last = close[-1]
+    return [last / close[-1 - n] - 1 if len(close) > n else np.nan for n in periods]
+
+
+def trailing_return_table(close: np.ndarray, periods: Tuple[int, ...] = TREND_PERIODS) -> np.ndarray:
+    # Row i holds trailing_returns(close[:i + 1], periods)
+    table = np.full((len(close), len(periods)), np.nan)
+    for k, n in enumerate(periods):
+        table[n:, k] = close[n:] / close[:-n] - 1
+    return table
+
+
+def indicator_mask(columns) -> int:
+    col_mask = 0
+    if 'sma20' in columns and 'sma50' in columns:
+        col_mask |= HAS_SMA
+    if 'rsi14' in columns:
+        col_mask |= HAS_RSI
+    if 'macd' in columns and 'macd_signal' in columns:
+        col_mask |= HAS_MACD
+    if 'bb_low' in columns and 'bb_high' in columns:
+        col_mask |= HAS_BB
+    return col_mask
+
+
+def technical_signals(columns: Mapping[str, np.ndarray], col_mask: int, num_rows: int) -> Tuple[str, float]:
+    has_prev = num_rows > 2
+    values = np.full(NUM_VALUES, np.nan)
+    close_values = columns['Close']
+    values[V_CLOSE] = close_values[-1]
+    if num_rows > 2:
+        values[V_CLOSE_2] = close_values[-3]
+    if num_rows > 5:
+        values[V_CLOSE_5] = close_values[-6]
+    
+    if col_mask & HAS_SMA:
+        sma20_values = columns['sma20']
+        sma50_values = columns['sma50']
+        values[V_SMA20] = sma20_values[-1]
+        values[V_SMA50] = sma50_values[-1]
+        if has_prev:
+            values[V_PREV_SMA20] = sma20_values[-2]
+            values[V_PREV_SMA50] = sma50_values[-2]
+    
+    if col_mask & HAS_RSI:
+        values[V_RSI14] = columns['rsi14'][-1]
+    
+    if col_mask & HAS_MACD:
+        macd_values = columns['macd']
+        signal_values = columns['macd_signal']
+        values[V_MACD] = macd_values[-1]
+        values[V_MACD_SIGNAL] = signal_values[-1]
+        if has_prev:
+            values[V_PREV_MACD] = macd_values[-2]
+            values[V_PREV_MACD_SIGNAL] = signal_values[-2]
+    
+    if col_mask & HAS_BB:
+        values[V_BB_LOW] = columns['bb_low'][-1]
+        values[V_BB_HIGH] = columns['bb_high'][-1]
+    
+    code, confidence = aggregate_signals(values, col_mask, num_rows)
+    return ACTIONS[code], float(confidence)
+
+
+class TradeSignal:
+    __slots__ = ("ticker", "action", "confidence", "price", "status", "cash_available", "trade_value")
+    
+    def __init__(self, ticker: str, action: str, confidence: float, price: float, status: str,
+                 cash_available: Optional[float] = None, trade_value: Optional[float] = None):
+        self.ticker = ticker
+        self.action = action
+        self.confidence = confidence
+        self.price = price
+        self.status = status
+        self.cash_available = cash_available
+        self.trade_value = trade_value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "ticker": self.ticker,
+            "action": self.action,
+            "confidence": self.confidence,
+            "price": self.price,
+            "quantity": 0,
+            "value": 0,
+            "status": self.status
+        }
+        if self.cash_available is not None:
+            result["cash_available"] = self.cash_available
+            result["trade_value"] = self.trade_value
+        return result
+
 
 class MLAgent(AgentBase):
     
+    # lstm model path -> (lstm model, transformer model), shared by every agent in the process
+    _MODEL_REGISTRY: Dict[str, Tuple[Any, Any]] = {}
+    _REGISTRY_LOCK = threading.Lock()
+    
     def __init__(self, 
                  agent_id: str,
                  tickers: List[str],
                  personality: str = "balanced",
                  models_dir: str = "models",
                  log_dir: str = "logs",
-                 data_cache_dir: str = "cache"):
+                 data_cache_dir: str = "cache",
+                 verbose: bool = False,
+                 eager_load: bool = False,
+                 use_technicals: Optional[bool] = None,
+                 quantized: bool = False,
+                 data_loader: Optional[DataLoader] = None):
         super().__init__(agent_id, tickers, models_dir, log_dir)
         
         self.personality = personality
+        self.verbose = verbose
         
         self.config = self._get_personality_config(personality)
+        if use_technicals is None:
+            use_technicals = self.config.w_technicals > 1e-6
+        self.use_technicals = use_technicals
         
-        self.data_loader = DataLoader(tickers, cache_dir=data_cache_dir)
+        if data_loader is None:
+            data_loader = DataLoader(tickers, cache_dir=data_cache_dir)
+        self.data_loader = data_loader
         
-        self.models = {}
         self._init_models()
+        self._init_positions()
+        if eager_load:
+            self.load_models(quantized=quantized)
         
         self.state["type"] = "ml_agent"
         self.state["personality"] = personality
-        self.state["config"] = self.config
+        self.state["config"] = self.config.to_dict()
         self._save_state()
         
-    def _get_personality_config(self, personality: str) -> Dict[str, Any]:
-        common_config = {
-            "lookback_window": 30,
-            "prediction_threshold": 0.52,
-            "position_sizing": 0.1,
-            "max_position": 0.25,
-            "stop_loss": 0.05,
-            "take_profit": 0.10,
-            "use_stop_loss": True,
-            "use_take_profit": True
-        }
-        
-        if personality == "conservative":
-            return {
-                **common_config,
-                "prediction_threshold": 0.55,
-                "position_sizing": 0.05,
-                "max_position": 0.15,
-                "stop_loss": 0.03,
-                "take_profit": 0.07,
-                "confidence_weight": {
-                    "lstm": 0.35,
-                    "transformer": 0.35,
-                    "technicals": 0.3
-                }
-            }
-        elif personality == "balanced":
-            return {
-                **common_config,
-                "prediction_threshold": 0.52,
-                "confidence_weight": {
-                    "lstm": 0.45,
-                    "transformer": 0.45,
-                    "technicals": 0.1
-                }
-            }
-        elif personality == "aggressive":
-            return {
-                **common_config,
-                "prediction_threshold": 0.51,
-                "position_sizing": 0.15,
-                "max_position": 0.35,
-                "stop_loss": 0.07,
-                "take_profit": 0.15,
-                "confidence_weight": {
-                    "lstm": 0.5, 
-                    "transformer": 0.5,
-                    "technicals": 0.0
-                }
-            }
-        elif personality == "trend":
-            return {
-                **common_config,
-                "prediction_threshold": 0.53,
-                "position_sizing": 0.12,
-                "confidence_weight": {
-                    "lstm": 0.25,
-                    "transformer": 0.25,
-                    "technicals": 0.5
-                }
-            }
-        else:
-            return {
-                **common_config,
-                "prediction_threshold": 0.52,
-                "confidence_weight": {
-                    "lstm": 0.45,
-                    "transformer": 0.45,
-                    "technicals": 0.1
-                }
-            }
+    def _get_personality_config(self, personality: str) -> PersonalityConfig:
+        return _PERSONALITY_CONFIGS.get(personality, _PERSONALITY_CONFIGS["balanced"])
     
     def _init_models(self) -> None:
-        for ticker in self.tickers:
-            lstm_dir = os.path.join(self.models_dir, ticker, "lstm")
-            transformer_dir = os.path.join(self.models_dir, ticker, "transformer")
+        num_tickers = len(self.tickers)
+        self._ticker_idx = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._trained = np.zeros(num_tickers, dtype=bool)
+        self._lstm_paths = []
+        self._transformer_paths = []
+        self._lstm_quantized_paths = [None] * num_tickers
+        self._transformer_quantized_paths = [None] * num_tickers
+        self._lstm_models = [None] * num_tickers
+        self._transformer_models = [None] * num_tickers
+        # ticker -> analysis window cut from the training download, reused while it ends today
+        self._fresh_history: Dict[str, pd.DataFrame] = {}
+        
+        models_root = Path(self.models_dir)
+        # One directory listing per level instead of a stat per candidate file
+        ticker_dirs = _entry_names(models_root)
+        lines = []
+        
+        for i, ticker in enumerate(self.tickers):
+            ticker_dir = models_root / ticker
+            lstm_path = ticker_dir / "lstm" / "model.keras"
+            transformer_path = ticker_dir / "transformer" / "model.keras"
             
-            os.makedirs(lstm_dir, exist_ok=True)
-            os.makedirs(transformer_dir, exist_ok=True)
+            self._lstm_paths.append(str(lstm_path))
+            self._transformer_paths.append(str(transformer_path))
             
-            lstm_path = os.path.join(lstm_dir, "model.keras")
-            transformer_path = os.path.join(transformer_dir, "model.keras")
+            shared = self._MODEL_REGISTRY.get(str(lstm_path))
+            if shared is not None:
+                self._lstm_models[i], self._transformer_models[i] = shared
+                self._trained[i] = True
             
-            self.models[ticker] = {
-                "lstm": None,
-                "transformer": None,
-                "trained": False
-            }
+            if ticker not in ticker_dirs:
+                continue
             
-            if os.path.exists(lstm_path):
-                try:
-                    lookback_window = self.config["lookback_window"]
-                    
-                    self.models[ticker]["lstm"] = {
-                        "model_path": lstm_path,
-                        "status": "loaded"
-                    }
-                    self.models[ticker]["trained"] = True
-                    print(f"LSTM model for {ticker} registered at {lstm_path}")
-                except Exception as e:
-                    print(f"Error loading LSTM model for {ticker}: {e}")
+            lstm_files = _entry_names(lstm_path.parent)
+            transformer_files = _entry_names(transformer_path.parent)
+            
+            if lstm_path.name in lstm_files:
+                self._trained[i] = True
+                lines.append(f"LSTM model for {ticker} registered at {lstm_path}")
+            
+            if transformer_path.name in transformer_files:
+                self._trained[i] = True
+                lines.append(f"Transformer model for {ticker} registered at {transformer_path}")
             
-            if os.path.exists(transformer_path):
+            for model_path, files, quantized_paths in (
+                    (lstm_path, lstm_files, self._lstm_quantized_paths),
+                    (transformer_path, transformer_files, self._transformer_quantized_paths)):
+                if QUANTIZED_MODEL_FILE in files:
+                    quantized_path = model_path.with_name(QUANTIZED_MODEL_FILE)
+                    quantized_paths[i] = str(quantized_path)
+                    lines.append(f"Quantized model for {ticker} registered at {quantized_path}")
+        
+        self._all_trained = bool(self._trained.all())
+        self._flush_lines(lines)
+    
+    def load_models(self, warmup: bool = True, quantized: bool = False) -> Dict[str, str]:
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+        from models.lstm_model import LSTMModel
+        from models.transformer_model import TransformerModel
+        from models.tflite_model import QuantizedModel
+        
+        lines = []
+        load_results = {}
+        start_ns = time.monotonic_ns()
+        
+        with self._REGISTRY_LOCK:
+            for i in np.flatnonzero(self._trained):
+                ticker = self.tickers[i]
+                # INT8 interpreters are registered apart from the Keras models they were exported from
+                registry_key = self._lstm_paths[i] + (f"::{QUANTIZED_MODEL_FILE}" if quantized else "")
+                shared = self._MODEL_REGISTRY.get(registry_key)
+                if shared is not None:
+                    self._lstm_models[i], self._transformer_models[i] = shared
+                    load_results[ticker] = "shared"
+                    continue
+                
                 try:
-                    self.models[ticker]["transformer"] = {
-                        "model_path": transformer_path,
-                        "status": "loaded"
-                    }
-                    self.models[ticker]["trained"] = True
-                    print(f"Transformer model for {ticker} registered at {transformer_path}")
+                    loaded = []
+                    for model_cls, model_path, quantized_path in (
+                            (LSTMModel, self._lstm_paths[i], self._lstm_quantized_paths[i]),
+                            (TransformerModel, self._transformer_paths[i], self._transformer_quantized_paths[i])):
+                        model = None
+                        if quantized and quantized_path is not None:
+                            model = QuantizedModel(quantized_path)
+                        elif os.path.isfile(model_path):
+                            model = model_cls(input_shape=None, model_path=model_path)
+                        if model is not None and warmup:
+                            model.predict(np.zeros((1,) + tuple(model.input_shape), dtype=np.float32))
+                        loaded.append(model)
+                    
+                    self._lstm_models[i], self._transformer_models[i] = loaded
+                    self._MODEL_REGISTRY[registry_key] = tuple(loaded)
+                    load_results[ticker] = "loaded"
                 except Exception as e:
-                    print(f"Error loading Transformer model for {ticker}: {e}")
+                    lines.append(f"Error loading models for {ticker}: {e}")
+                    load_results[ticker] = "error"
+        
+        self.state["warmup_ms"] = (time.monotonic_ns() - start_ns) / 1e6
+        self._flush_lines(lines, force=True)
+        return load_results
+    
+    def refresh_models(self) -> None:
+        # Picks up models written by another process: forget the in-memory
+        # copies of this agent's paths and rescan the models directory.
+        with self._REGISTRY_LOCK:
+            for lstm_path in self._lstm_paths:
+                self._MODEL_REGISTRY.pop(lstm_path, None)
+                self._MODEL_REGISTRY.pop(f"{lstm_path}::{QUANTIZED_MODEL_FILE}", None)
+        self._init_models()
+    
+    def is_trained(self, ticker: str) -> bool:
+        i = self._ticker_idx.get(ticker)
+        return i is not None and bool(self._trained[i])
+    
+    @property
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        models = {}
+        for i, ticker in enumerate(self.tickers):
+            models[ticker] = {
+                "lstm": {
+                    "model": self._lstm_models[i],
+                    "model_path": self._lstm_paths[i],
+                    "quantized_path": self._lstm_quantized_paths[i]
+                },
+                "transformer": {
+                    "model": self._transformer_models[i],
+                    "model_path": self._transformer_paths[i],
+                    "quantized_path": self._transformer_quantized_paths[i]
+                },
+                "trained": bool(self._trained[i])
+            }
+        return models
+    
+    def _init_positions(self) -> None:
+        num_tickers = len(self.tickers)
+        self._pos_shares = np.zeros(num_tickers)
+        self._pos_cost_basis = np.zeros(num_tickers)
+        for ticker in self.state["positions"]:
+            self._sync_position(ticker)
     
-    def train_models(self, force_retrain: bool = False) -> Dict[str, Any]:
-        print("Training models...")
-        start_time = time.time()
+    def _sync_position(self, ticker: str) -> None:
+        i = self._ticker_idx.get(ticker)
+        if i is None:
+            return
+        position = self.state["positions"].get(ticker)
+        if position is None:
+            self._pos_shares[i] = 0.0
+            self._pos_cost_basis[i] = 0.0
+        else:
+            self._pos_shares[i] = position["shares"]
+            self._pos_cost_basis[i] = position["cost_basis"]
+    
+    def execute_trade(self, 
+                      ticker: str, 
+                      action: str,
+                      confidence: float,
+                      price: float,
+                      quantity: Optional[float] = None,
+                      allocation: Optional[float] = None,
+                      autosave: bool = True) -> TradeResult:
+        trade_result = super().execute_trade(
+            ticker, action, confidence, price,
+            quantity=quantity, allocation=allocation, autosave=autosave
+        )
+        self._sync_position(ticker)
+        return trade_result
+    
+    def _portfolio_value(self, prices: Dict[str, float]) -> float:
+        ticker_idx = self._ticker_idx
+        if any(ticker not in ticker_idx for ticker in self.state["positions"]):
+            return super()._portfolio_value(prices)
+        
+        num_tickers = len(self.tickers)
+        priced = np.fromiter((ticker in prices for ticker in self.tickers), dtype=bool, count=num_tickers)
+        price_values = np.fromiter(
+            (prices.get(ticker, 0.0) for ticker in self.tickers), dtype=np.float64, count=num_tickers
+        )
+        held = priced & (self._pos_shares != 0)
+        return self.state["cash"] + float(np.dot(self._pos_shares[held], price_values[held]))
+    
+    def _flush_lines(self, lines: List[str], force: bool = False) -> None:
+        if lines and (self.verbose or force):
+            sys.stdout.write("\n".join(lines) + "\n")
+    
+    def train_models(self,
+                     force_retrain: bool = False,
+                     fit_jobs: Optional[Callable[[List[Tuple[Any, ...]]], List[Tuple[Any, ...]]]] = None) -> Dict[str, Any]:
+        lines = ["Training models..."]
+        start_ns = time.monotonic_ns()
         training_results = {}
         
-        for ticker in self.tickers:
-            print(f"\nTraining models for {ticker}...")
-            
-            if self.models[ticker]["trained"] and not force_retrain:
-                print(f"Models for {ticker} already trained. Use force_retrain=True to retrain.")
+        if force_retrain:
+            pending = np.arange(len(self.tickers))
+        else:
+            for i in np.flatnonzero(self._trained):
+                ticker = self.tickers[i]
+                lines.append(f"Models for {ticker} already trained. Use force_retrain=True to retrain.")
                 training_results[ticker] = {"status": "skipped", "reason": "already_trained"}
-                continue
-            
-            try:
-                df = self.data_loader.download_historical_data(period="5y")[ticker]
-                
-                df = self.data_loader.add_technical_indicators(df)
-                
-                X_train, y_train, X_val, y_val, X_test, y_test = self.data_loader.train_test_split(
-                    df, lookback=self.config["lookback_window"]
-                )
-                
-                lstm_path = os.path.join(self.models_dir, ticker, "lstm", "model.keras")
-                transformer_path = os.path.join(self.models_dir, ticker, "transformer", "model.keras")
-                
-                input_shape = (X_train.shape[1], X_train.shape[2])
-                lstm_model = LSTMModel(input_shape=input_shape, model_path=None)
-                lstm_history = lstm_model.train(X_train, y_train, X_val, y_val, save_path=lstm_path)
-                
-                transformer_model = TransformerModel(
-                    input_shape=input_shape, 
-                    model_path=None
-                )
-                transformer_history = transformer_model.train(X_train, y_train, X_val, y_val, save_path=transformer_path)
-                
-                lstm_eval = lstm_model.evaluate(X_test, y_test)
-                transformer_eval = transformer_model.evaluate(X_test, y_test)
-                
-                self.models[ticker]["lstm"] = {
-                    "model": lstm_model,
-                    "model_path": lstm_path,
-                    "performance": lstm_eval,
-                    "status": "trained"
-                }
-                
-                self.models[ticker]["transformer"] = {
-                    "model": transformer_model,
-                    "model_path": transformer_path,
-                    "performance": transformer_eval,
-                    "status": "trained"
-                }
-                
-                self.models[ticker]["trained"] = True
-                
-                training_results[ticker] = {
-                    "status": "success",
-                    "lstm_eval": lstm_eval,
-                    "transformer_eval": transformer_eval,
-                    "data_shape": {
-                        "X_train": X_train.shape,
-                        "y_train": y_train.shape,
-                        "X_val": X_val.shape,
-                        "y_val": y_val.shape,
-                        "X_test": X_test.shape,
-                        "y_test": y_test.shape
-                    }
-                }
+            pending = np.flatnonzero(~self._trained)
+        self._flush_lines(lines)
+        
+        with self._REGISTRY_LOCK:
+            to_train = []
+            for i in pending:
+                ticker = self.tickers[i]
                 
-                print(f"Training for {ticker} completed successfully!")
-                print(f"LSTM model accuracy: {lstm_eval['accuracy']:.4f}")
-                print(f"Transformer model accuracy: {transformer_eval['accuracy']:.4f}")
+                shared = None if force_retrain else self._MODEL_REGISTRY.get(self._lstm_paths[i])
+                if shared is not None:
+                    self._lstm_models[i], self._transformer_models[i] = shared
+                    self._trained[i] = True
+                    training_results[ticker] = {"status": "skipped", "reason": "already_trained"}
+                else:
+                    to_train.append(i)
+            
+            history = self.data_loader.download_historical_data(period="5y") if to_train else {}
+            with ThreadPoolExecutor(max_workers=max(1, min(WORKER_THREADS, len(to_train)))) as executor:
+                splits = [
+                    executor.submit(self._prepare_training_data, self.tickers[i], history) for i in to_train
+                ]
                 
-            except Exception as e:
-                print(f"Error training models for {ticker}: {e}")
-                training_results[ticker] = {"status": "error", "error": str(e)}
+                fitted = self._fit_pending(to_train, splits, fit_jobs)
+                for i, (lstm_model, transformer_model, result, quantized, lines) in zip(to_train, fitted):
+                    ticker = self.tickers[i]
+                    training_results[ticker] = result
+                    if result["status"] != "success":
+                        self._flush_lines(lines, force=True)
+                        continue
+                    
+                    self._lstm_quantized_paths[i], self._transformer_quantized_paths[i] = quantized
+                    self._lstm_models[i] = lstm_model
+                    self._transformer_models[i] = transformer_model
+                    self._trained[i] = True
+                    # Models fitted in a worker process are read back from disk by load_models
+                    if lstm_model is not None:
+                        self._MODEL_REGISTRY[self._lstm_paths[i]] = (lstm_model, transformer_model)
+                    self._flush_lines(lines)
+        
+        self._all_trained = bool(self._trained.all())
         
-        elapsed_time = time.time() - start_time
+        elapsed_time = (time.monotonic_ns() - start_ns) / 1e9
         training_log = {
             "type": "training",
             "duration": elapsed_time,
@@ -238,162 +593,187 @@ class MLAgent(AgentBase):
         
         return training_results
     
-    def _check_technical_signals(self, df: pd.DataFrame) -> Tuple[str, float]:
-        latest = df.iloc[-1]
-        
-        signals = []
-        
-        has_sma = 'sma20' in df.columns and 'sma50' in df.columns
-        has_rsi = 'rsi14' in df.columns
-        has_macd = 'macd' in df.columns and 'macd_signal' in df.columns
-        has_bb = 'bb_low' in df.columns and 'bb_high' in df.columns
-        
-        if has_sma:
-            ma_cross = False
-            if len(df) > 2:
-                prev = df.iloc[-2]
-                if latest['sma20'] > latest['sma50'] and prev['sma20'] <= prev['sma50']:
-                    signals.append(('buy', 0.75))  
-                    ma_cross = True
-                elif latest['sma20'] < latest['sma50'] and prev['sma20'] >= prev['sma50']:
-                    signals.append(('sell', 0.75))  
-                    ma_cross = True
-                    
-            if not ma_cross:
-                if latest['Close'] > latest['sma50'] and latest['sma20'] > latest['sma50']:
-                    signals.append(('buy', 0.6))  
-                elif latest['Close'] < latest['sma50'] and latest['sma20'] < latest['sma50']:
-                    signals.append(('sell', 0.6))  
-                else:
-                    if latest['Close'] > latest['sma20']:
-                        signals.append(('buy', 0.55))  
-                    else:
-                        signals.append(('sell', 0.55))  
+    def _fit_pending(self,
+                     to_train: List[int],
+                     splits: List[Any],
+                     fit_jobs: Optional[Callable[[List[Tuple[Any, ...]]], List[Tuple[Any, ...]]]] = None) -> List[Tuple[Any, ...]]:
+        jobs = [
+            (self.tickers[i], self._lstm_paths[i], self._transformer_paths[i], split)
+            for i, split in zip(to_train, splits)
+        ]
+        
+        def fit(submit, ticker, lstm_path, transformer_path, split):
+            try:
+                data = split.result()
+            except Exception as e:
+                error_lines = [f"\nTraining models for {ticker}...", f"Error training models for {ticker}: {e}"]
+                return None, None, {"status": "error", "error": str(e)}, (None, None), error_lines
+            return submit(ticker, lstm_path, transformer_path, data)
+        
+        if fit_jobs is not None:
+            # The caller fits every prepared job in one go (e.g. in another
+            # process); failed preparations stay as error tuples in place.
+            ready = []
+            fitted = [fit(lambda *job: ready.append(job), *job) for job in jobs]
+            results = iter(fit_jobs(ready) if ready else [])
+            return [item if isinstance(item, tuple) else next(results) for item in fitted]
+        
+        devices = _training_devices() if len(jobs) > 1 else []
+        if len(devices) < 2:
+            return [fit(_fit_ticker_models, *job) for job in jobs]
+        
+        # One spawned worker per GPU, each pinned to its device before TensorFlow loads
+        context = multiprocessing.get_context("spawn")
+        device_queue = context.Queue()
+        for device in devices:
+            device_queue.put(device)
+        
+        with ProcessPoolExecutor(max_workers=min(len(devices), len(jobs)), mp_context=context,
+                                 initializer=_pin_training_device, initargs=(device_queue,)) as executor:
+            def submit(*args):
+                return executor.submit(_fit_ticker_models_worker, *args)
+            
+            fitted = [fit(submit, *job) for job in jobs]
+            return [item if isinstance(item, tuple) else item.result() for item in fitted]
+    
+    def _prepare_training_data(self, ticker: str, history: Dict[str, pd.DataFrame]) -> Tuple[np.ndarray, ...]:
+        raw = history[ticker]
+        if not raw.empty and pd.Timestamp(raw.index[-1]).date() == datetime.now().date():
+            self._fresh_history[ticker] = trim_to_period(raw, ANALYSIS_PERIOD)
+        
+        df = self.data_loader.add_technical_indicators(raw, ticker=ticker)
+        return self.data_loader.train_test_split(df, lookback=self.config.lookback_window)
+    
+    def _analysis_history(self) -> Dict[str, pd.DataFrame]:
+        today = datetime.now().date()
+        fresh = self._fresh_history
+        for ticker in [t for t, df in fresh.items() if pd.Timestamp(df.index[-1]).date() != today]:
+            del fresh[ticker]
+        
+        if all(ticker in fresh for ticker, trained in zip(self.tickers, self._trained) if trained):
+            return dict(fresh)
+        return self.data_loader.download_historical_data(period=ANALYSIS_PERIOD)
+    
+    def _check_technical_signals(self, df: pd.DataFrame, col_mask: Optional[int] = None) -> Tuple[str, float]:
+        if col_mask is None:
+            col_mask = indicator_mask(df.columns)
+        
+        columns = {name: df[name].to_numpy() for name in ANALYSIS_COLUMNS if name in df.columns}
+        return technical_signals(columns, col_mask, len(df))
+    
+    def _ticker_features(self, ticker: str, df: pd.DataFrame, lines: List[str]) -> Dict[str, Any]:
+        first_line = len(lines)
+        use_technicals = self.use_technicals
+        columns = ANALYSIS_COLUMNS if use_technicals else PROXY_COLUMNS
+        df = self.data_loader.add_technical_indicators(df, columns=columns, ticker=ticker)
+        
+        missing_columns = [col for col in columns if col not in df.columns]
+        if missing_columns:
+            lines.append(f"Warning: Missing columns for {ticker}: {missing_columns}")
+            lines.append(f"Available columns: {df.columns.tolist()}")
+            raise KeyError(f"Missing required columns: {missing_columns}")
+        
+        col_mask = ALL_INDICATORS
+        
+        # Leave pandas once: every read below indexes column views of one float block.
+        values = df[columns].to_numpy(dtype=np.float64)
+        arrays = {name: values[:, k] for k, name in enumerate(columns)}
+        close_values = arrays['Close']
+        current_price = close_values[-1]
+        
+        if use_technicals:
+            tech_signal, tech_confidence = technical_signals(arrays, col_mask, len(values))
         else:
-            if len(df) > 5:
-                price_change = df['Close'].pct_change(5).iloc[-1]
-                if price_change > 0:
-                    signals.append(('buy', 0.55))  
-                else:
-                    signals.append(('sell', 0.55))  
-        
-        if has_rsi:
-            if latest['rsi14'] < 30:
-                signals.append(('buy', 0.7))  
-            elif latest['rsi14'] > 70:
-                signals.append(('sell', 0.7))  
-            elif latest['rsi14'] < 40:
-                signals.append(('buy', 0.6))  
-            elif latest['rsi14'] > 60:
-                signals.append(('sell', 0.6))  
-            elif latest['rsi14'] < 45:
-                signals.append(('buy', 0.55))  
-            elif latest['rsi14'] > 55:
-                signals.append(('sell', 0.55))  
-            else:
-                signals.append(('hold', 0.5))
-        
-        if has_macd:
-            macd_cross = False
-            if len(df) > 2:
-                prev = df.iloc[-2]
-                if latest['macd'] > latest['macd_signal'] and prev['macd'] <= prev['macd_signal']:
-                    signals.append(('buy', 0.75))  
-                    macd_cross = True
-                elif latest['macd'] < latest['macd_signal'] and prev['macd'] >= prev['macd_signal']:
-                    signals.append(('sell', 0.75))  
-                    macd_cross = True
-                    
-            if not macd_cross:
-                if latest['macd'] > latest['macd_signal'] and latest['macd'] > 0:
-                    signals.append(('buy', 0.65))  
-                elif latest['macd'] < latest['macd_signal'] and latest['macd'] < 0:
-                    signals.append(('sell', 0.65))  
-                elif latest['macd'] > latest['macd_signal']:
-                    signals.append(('buy', 0.55))  
-                elif latest['macd'] < latest['macd_signal']:
-                    signals.append(('sell', 0.55))  
-                else:
-                    signals.append(('hold', 0.5))  
-        
-        if has_bb:
-            bb_pct = (latest['Close'] - latest['bb_low']) / (latest['bb_high'] - latest['bb_low'])
-            if latest['Close'] < latest['bb_low']:
-                signals.append(('buy', 0.7))  
-            elif latest['Close'] > latest['bb_high']:
-                signals.append(('sell', 0.7))  
-            elif bb_pct < 0.3:
-                signals.append(('buy', 0.6))  
-            elif bb_pct > 0.7:
-                signals.append(('sell', 0.6))  
-            elif bb_pct < 0.4:
-                signals.append(('buy', 0.55))  
-            elif bb_pct > 0.6:
-                signals.append(('sell', 0.55))  
-            else:
-                signals.append(('hold', 0.5))
-        
-        if len(df) >= 5:
-            price_change = df['Close'].pct_change(5).iloc[-1]
-            if price_change > 0.03:
-                signals.append(('buy', 0.65))  
-            elif price_change < -0.03:
-                signals.append(('sell', 0.65))  
-            elif price_change > 0.01:
-                signals.append(('buy', 0.55))  
-            elif price_change < -0.01:
-                signals.append(('sell', 0.55))  
+            tech_signal, tech_confidence = 'hold', 0.0
+        
+        try:
+            short_trend, medium_trend, long_trend = trailing_returns(close_values)
+            
+            price_to_sma50 = current_price / arrays['sma50'][-1] - 1
+            
+            features = np.array(
+                [short_trend, medium_trend, long_trend, price_to_sma50, arrays['rsi14'][-1]], dtype=np.float64
+            )
+        except Exception as e:
+            lines.append(f"Error making model predictions for {ticker}: {e}")
+            features = None
+        
+        return {
+            "current_price": current_price,
+            "tech_signal": tech_signal,
+            "tech_confidence": tech_confidence,
+            "features": features,
+            "has_technicals": use_technicals,
+            "first_line": first_line
+        }
+    
+    def _analyze_ticker(self, ticker: str, df: pd.DataFrame, lines: List[str]) -> Tuple[Tuple[Any, float], Dict[str, Any], bool]:
+        bar_key = (df.index[-1], df['Close'].iat[-1])
+        
+        cached = _ANALYSIS_CACHE.get(ticker)
+        if cached is not None and cached[0] == bar_key and (cached[1]["has_technicals"] or not self.use_technicals):
+            lines.extend(cached[1]["lines"])
+            return bar_key, cached[1], False
+        
+        return bar_key, self._ticker_features(ticker, df, lines), True
+    
+    def _predict_pending(self, pending: List[Tuple[str, List[str], Tuple[Any, float], Dict[str, Any]]]) -> None:
+        batch = [predictions["features"] for _, _, _, predictions in pending if predictions["features"] is not None]
+        if batch:
+            # Allocated per call: analyze() may run twice at once on one agent
+            features = np.array(batch, dtype=np.float64)
+            lstm_preds, transformer_preds = _proxy_predictions(features)
+            lstm_preds = lstm_preds.tolist()
+            transformer_preds = transformer_preds.tolist()
+        
+        row = 0
+        for ticker, lines, bar_key, predictions in pending:
+            features = predictions.pop("features")
+            if features is not None:
+                lstm_pred = lstm_preds[row]
+                transformer_pred = transformer_preds[row]
+                row += 1
+                lines.append(f"Using trend-based predictions for {ticker}:")
+                lines.append(f"  Short-term trend: {features[0]:.4f}, Medium-term: {features[1]:.4f}")
+                lines.append(f"  LSTM-proxy prediction: {lstm_pred:.4f}")
+                lines.append(f"  Transformer-proxy prediction: {transformer_pred:.4f}")
             else:
-                signals.append(('hold', 0.5))
-        
-        buy_signals = [(action, conf) for action, conf in signals if action == 'buy']
-        sell_signals = [(action, conf) for action, conf in signals if action == 'sell']
-        hold_signals = [(action, conf) for action, conf in signals if action == 'hold']
-        
-        if len(signals) < 3:
-            if len(df) >= 3:
-                recent_trend = df['Close'].iloc[-1] > df['Close'].iloc[-3]
-                if recent_trend:
-                    signals.append(('buy', 0.55))
-                    buy_signals.append(('buy', 0.55))
-                else:
-                    signals.append(('sell', 0.55))
-                    sell_signals.append(('sell', 0.55))
-        
-        if len(buy_signals) >= len(sell_signals) and len(buy_signals) >= len(hold_signals):
-            avg_confidence = sum(conf for _, conf in buy_signals) / len(buy_signals) if buy_signals else 0.5
-            return 'buy', avg_confidence
-        elif len(sell_signals) >= len(buy_signals) and len(sell_signals) >= len(hold_signals):
-            avg_confidence = sum(conf for _, conf in sell_signals) / len(sell_signals) if sell_signals else 0.5
-            return 'sell', avg_confidence
-        else:
-            avg_confidence = sum(conf for _, conf in hold_signals) / len(hold_signals) if hold_signals else 0.5
-            return 'hold', avg_confidence
+                tech_signal = predictions["tech_signal"]
+                tech_signal_value = 1 if tech_signal == 'buy' else (0 if tech_signal == 'sell' else 0.5)
+                lstm_pred = 0.45 + (tech_signal_value * 0.1)
+                transformer_pred = 0.4 + (tech_signal_value * 0.2)
+            
+            predictions["lstm_pred"] = lstm_pred
+            predictions["transformer_pred"] = transformer_pred
+            predictions["lines"] = lines[predictions.pop("first_line"):]
+            _ANALYSIS_CACHE[ticker] = (bar_key, predictions)
     
-    def analyze(self) -> Dict[str, Any]:
-        print("Analyzing tickers...")
+    def collect_signals(self) -> Dict[str, Any]:
+        self._flush_lines(["Analyzing tickers..."])
         analysis_results = {}
         current_prices = {}
+        pending = []
+        ready = []
+        
+        history = self._analysis_history() if self._trained.any() else {}
+        ticker_lines = [[f"\nAnalyzing {ticker}..."] for ticker in self.tickers]
+        executor = ThreadPoolExecutor(max_workers=WORKER_THREADS)
+        jobs = [
+            executor.submit(self._analyze_ticker, ticker, history[ticker], lines)
+            if trained and ticker in history else None
+            for ticker, trained, lines in zip(self.tickers, self._trained, ticker_lines)
+        ]
+        executor.shutdown(wait=False)
         
-        for ticker in self.tickers:
-            print(f"\nAnalyzing {ticker}...")
+        for i, ticker in enumerate(self.tickers):
+            lines = ticker_lines[i]
             
             try:
-                df = self.data_loader.download_historical_data(period="60d")[ticker]
-                df = self.data_loader.add_technical_indicators(df)
-                
-                required_columns = ['Close', 'sma20', 'sma50', 'rsi14', 'macd', 'macd_signal', 'bb_low', 'bb_high']
-                missing_columns = [col for col in required_columns if col not in df.columns]
-                if missing_columns:
-                    print(f"Warning: Missing columns for {ticker}: {missing_columns}")
-                    print(f"Available columns: {df.columns.tolist()}")
-                    raise KeyError(f"Missing required columns: {missing_columns}")
-                
-                current_price = df.iloc[-1]['Close']
-                current_prices[ticker] = current_price
-                
-                if not self.models[ticker]["trained"]:
-                    print(f"Models for {ticker} not trained. Skipping analysis.")
+                if not self._trained[i]:
+                    current_price = self.data_loader.get_last_price(ticker, period=ANALYSIS_PERIOD)
+                    current_prices[ticker] = current_price
+                    lines.append(f"Models for {ticker} not trained. Skipping analysis.")
+                    self._flush_lines(lines)
                     analysis_results[ticker] = {
                         "status": "error", 
                         "error": "models_not_trained",
@@ -401,111 +781,110 @@ class MLAgent(AgentBase):
                     }
                     continue
                 
-                tech_signal, tech_confidence = self._check_technical_signals(df)
-                
-                latest_data = self.data_loader.get_latest_data(ticker, lookback=self.config["lookback_window"])
-                
-                try:
-                    short_trend = df['Close'].pct_change(5).iloc[-1]
-                    medium_trend = df['Close'].pct_change(10).iloc[-1]
-                    long_trend = df['Close'].pct_change(20).iloc[-1]
-                    
-                    price_to_sma20 = df['Close'].iloc[-1] / df['sma20'].iloc[-1] - 1 if 'sma20' in df.columns else 0
-                    price_to_sma50 = df['Close'].iloc[-1] / df['sma50'].iloc[-1] - 1 if 'sma50' in df.columns else 0
-                    
-                    rsi = df['rsi14'].iloc[-1] if 'rsi14' in df.columns else 50
-                    
-                    lstm_weight_short = 0.6
-                    lstm_weight_medium = 0.4
-                    
-                    lstm_direction = (short_trend * lstm_weight_short) + (medium_trend * lstm_weight_medium)
-                    lstm_pred = 0.5 + min(0.45, max(-0.45, lstm_direction * 5)) # Scale but limit to 0.05-0.95 range
-                    
-                    transformer_direction = long_trend * 0.4 + price_to_sma50 * 0.3
-                    
-                    if rsi > 70:
-                        transformer_direction -= 0.05
-                    elif rsi < 30:
-                        transformer_direction += 0.05
-                        
-                    transformer_pred = 0.5 + min(0.48, max(-0.48, transformer_direction * 5))
-                    
-                    print(f"Using trend-based predictions for {ticker}:")
-                    print(f"  Short-term trend: {short_trend:.4f}, Medium-term: {medium_trend:.4f}")
-                    print(f"  LSTM-proxy prediction: {lstm_pred:.4f}")
-                    print(f"  Transformer-proxy prediction: {transformer_pred:.4f}")
-                    
-                except Exception as e:
-                    print(f"Error making model predictions for {ticker}: {e}")
-                    tech_signal_value = 1 if tech_signal == 'buy' else (0 if tech_signal == 'sell' else 0.5)
-                    lstm_pred = 0.45 + (tech_signal_value * 0.1)
-                    transformer_pred = 0.4 + (tech_signal_value * 0.2)
-                
-                lstm_signal = 'buy' if lstm_pred > 0.5 else 'sell'
-                transformer_signal = 'buy' if transformer_pred > 0.5 else 'sell'
-                
-                lstm_confidence = 0.5 + abs(lstm_pred - 0.5)
-                transformer_confidence = 0.5 + abs(transformer_pred - 0.5)
+                if jobs[i] is None:
+                    raise KeyError(ticker)
+                bar_key, predictions, is_new = jobs[i].result()
+                if is_new:
+                    pending.append((ticker, lines, bar_key, predictions))
                 
-                weights = self.config["confidence_weight"]
-                
-                buy_confidence = 0
-                sell_confidence = 0
-                
-                if lstm_signal == 'buy':
-                    buy_confidence += lstm_confidence * weights["lstm"]
-                else:
-                    sell_confidence += lstm_confidence * weights["lstm"]
-                
-                if transformer_signal == 'buy':
-                    buy_confidence += transformer_confidence * weights["transformer"]
-                else:
-                    sell_confidence += transformer_confidence * weights["transformer"]
-                
-                if tech_signal == 'buy':
-                    buy_confidence += tech_confidence * weights["technicals"]
-                elif tech_signal == 'sell':
-                    sell_confidence += tech_confidence * weights["technicals"]
-                
-                final_signal = 'hold'
-                final_confidence = 0.5
-                
-                if buy_confidence > sell_confidence and buy_confidence > self.config["prediction_threshold"]:
-                    final_signal = 'buy'
-                    final_confidence = buy_confidence
-                elif sell_confidence > buy_confidence and sell_confidence > self.config["prediction_threshold"]:
-                    final_signal = 'sell'
-                    final_confidence = sell_confidence
+                current_prices[ticker] = predictions["current_price"]
+                analysis_results[ticker] = None
+                ready.append((ticker, lines, predictions))
                 
+            except Exception as e:
+                lines.append(f"Error analyzing {ticker}: {e}")
+                self._flush_lines(lines, force=True)
+                analysis_results[ticker] = {"status": "error", "error": str(e)}
+        
+        self._predict_pending(pending)
+        
+        return {"results": analysis_results, "current_prices": current_prices, "ready": ready}
+    
+    def analyze(self) -> Dict[str, Any]:
+        return self.analyze_shared(self.collect_signals())
+    
+    def analyze_shared(self, signals: Dict[str, Any]) -> Dict[str, Any]:
+        # signals comes from collect_signals(), possibly on another agent, so it is
+        # only read here; per-agent output goes into fresh dicts and line lists.
+        now_iso = datetime.now().isoformat()
+        analysis_results = {
+            ticker: None if result is None else dict(result)
+            for ticker, result in signals["results"].items()
+        }
+        current_prices = signals["current_prices"]
+        ready = signals["ready"]
+        
+        if ready:
+            lstm_preds = np.fromiter((p["lstm_pred"] for _, _, p in ready), dtype=np.float64, count=len(ready))
+            transformer_preds = np.fromiter((p["transformer_pred"] for _, _, p in ready), dtype=np.float64, count=len(ready))
+            if self.use_technicals:
+                tech_confidences = np.fromiter((p["tech_confidence"] for _, _, p in ready), dtype=np.float64, count=len(ready))
+                tech_signals = np.array([p["tech_signal"] for _, _, p in ready])
+            else:
+                tech_confidences = np.zeros(len(ready))
+                tech_signals = np.full(len(ready), 'hold')
+            
+            lstm_buy = lstm_preds > 0.5
+            transformer_buy = transformer_preds > 0.5
+            lstm_confidences = 0.5 + np.abs(lstm_preds - 0.5)
+            transformer_confidences = 0.5 + np.abs(transformer_preds - 0.5)
+            
+            config = self.config
+            lstm_votes = lstm_confidences * config.w_lstm
+            transformer_votes = transformer_confidences * config.w_transformer
+            tech_votes = tech_confidences * config.w_technicals
+            
+            buy_confidences = (
+                np.where(lstm_buy, lstm_votes, 0.0)
+                + np.where(transformer_buy, transformer_votes, 0.0)
+                + np.where(tech_signals == 'buy', tech_votes, 0.0)
+            )
+            sell_confidences = (
+                np.where(lstm_buy, 0.0, lstm_votes)
+                + np.where(transformer_buy, 0.0, transformer_votes)
+                + np.where(tech_signals == 'sell', tech_votes, 0.0)
+            )
+            
+            threshold = config.prediction_threshold
+            is_buy = (buy_confidences > sell_confidences) & (buy_confidences > threshold)
+            is_sell = ~is_buy & (sell_confidences > buy_confidences) & (sell_confidences > threshold)
+            final_codes = np.where(is_buy, 0, np.where(is_sell, 1, 2)).tolist()
+            final_confidences = np.where(is_buy, buy_confidences, np.where(is_sell, sell_confidences, 0.5)).tolist()
+            
+            columns = zip(
+                lstm_buy.tolist(), transformer_buy.tolist(), lstm_confidences.tolist(),
+                transformer_confidences.tolist(), tech_signals.tolist(), tech_confidences.tolist(),
+                final_codes, final_confidences
+            )
+            for (ticker, lines, predictions), row in zip(ready, columns):
+                (lstm_is_buy, transformer_is_buy, lstm_confidence, transformer_confidence,
+                 tech_signal, tech_confidence, final_code, final_confidence) = row
+                final_signal = ACTIONS[final_code]
                 analysis_results[ticker] = {
                     "status": "success",
-                    "current_price": current_price,
+                    "current_price": predictions["current_price"],
                     "signal": final_signal,
                     "confidence": final_confidence,
                     "model_predictions": {
                         "lstm": {
-                            "signal": lstm_signal,
+                            "signal": 'buy' if lstm_is_buy else 'sell',
                             "confidence": lstm_confidence,
-                            "raw_prediction": float(lstm_pred)
+                            "raw_prediction": float(predictions["lstm_pred"])
                         },
                         "transformer": {
-                            "signal": transformer_signal,
+                            "signal": 'buy' if transformer_is_buy else 'sell',
                             "confidence": transformer_confidence,
-                            "raw_prediction": float(transformer_pred)
+                            "raw_prediction": float(predictions["transformer_pred"])
                         }
                     },
                     "technical_signals": {
                         "signal": tech_signal,
                         "confidence": tech_confidence
                     },
-                    "analysis_time": datetime.now().isoformat()
+                    "analysis_time": now_iso
                 }
                 
-                print(f"Analysis for {ticker} completed: {final_signal.upper()} ({final_confidence:.4f})")
-                
-            except Exception as e:
-                print(f"Error analyzing {ticker}: {e}")
-                analysis_results[ticker] = {"status": "error", "error": str(e)}
+                self._flush_lines(lines + [f"Analysis for {ticker} completed: {final_signal.upper()} ({final_confidence:.4f})"])
         
         analysis_log = {
             "type": "analysis",
@@ -515,130 +894,264 @@ class MLAgent(AgentBase):
         
         self.update_portfolio_value(current_prices)
         
-        self.state["last_analysis_time"] = datetime.now().isoformat()
+        self.state["last_analysis_time"] = now_iso
         self._save_state()
         
         return analysis_results
     
-    def run(self) -> Dict[str, Any]:
-        print(f"Running agent {self.agent_id} ({self.personality})...")
+    def run(self, shared_signals: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        logger.info("Running agent %s (%s)...", self.agent_id, self.personality)
         
-        all_trained = all(self.models[ticker]["trained"] for ticker in self.tickers)
+        if self.state["cash"] <= 0 and not self.state["positions"]:
+            logger.info("Agent %s has no cash and no positions. Skipping analysis.", self.agent_id)
+            return {
+                "analysis": {},
+                "trades": {},
+                "portfolio": {
+                    "cash": self.state["cash"],
+                    "positions": self.state["positions"],
+                    "value": self.state["portfolio_value"]
+                }
+            }
         
-        if not all_trained:
-            print("Not all models are trained. Training now...")
-            self.train_models()
+        if shared_signals is not None:
+            analysis_results = self.analyze_shared(shared_signals)
+        else:
+            if not self._all_trained:
+                logger.info("Not all models are trained. Training now...")
+                self.train_models()
+            
+            analysis_results = self.analyze()
         
-        analysis_results = self.analyze()
+        trade_items = []
+        state = self.state
+        cash = state["cash"]
+        positions = state["positions"]
+        portfolio_value = state["portfolio_value"]
+        position_sizing = self.config.position_sizing
+        max_position = self.config.max_position
+        execute_trade = self.execute_trade
+        holds = []
         
-        trade_results = {}
+        tickers_ok = [ticker for ticker, analysis in analysis_results.items() if analysis["status"] == "success"]
+        confidences = np.fromiter(
+            (analysis_results[ticker]["confidence"] for ticker in tickers_ok),
+            dtype=np.float64, count=len(tickers_ok)
+        )
+        prices = np.fromiter(
+            (analysis_results[ticker]["current_price"] for ticker in tickers_ok),
+            dtype=np.float64, count=len(tickers_ok)
+        )
         
-        for ticker, analysis in analysis_results.items():
-            if analysis["status"] != "success":
-                continue
-            
-            signal = analysis["signal"]
-            confidence = analysis["confidence"]
-            price = analysis["current_price"]
-            
-            position_size = self.config["position_sizing"]
-            
-            adjusted_position = position_size * (confidence / 0.5)
-            
-            position_allocation = min(adjusted_position, self.config["max_position"])
-            
-            portfolio_value = self.state["portfolio_value"]
-            trade_value = portfolio_value * position_allocation
-            quantity = trade_value / price
-            
-            if signal == 'buy':
-                if trade_value <= self.state["cash"]:
-                    trade_result = self.execute_trade(
-                        ticker=ticker,
-                        action='buy',
-                        confidence=confidence,
-                        price=price,
-                        quantity=quantity
-                    )
-                else:
-                    trade_result = {
-                        "ticker": ticker,
-                        "action": "buy_signal",  
-                        "confidence": confidence,
-                        "price": price,
-                        "quantity": 0,
-                        "value": 0,
-                        "status": "insufficient_cash",
-                        "cash_available": self.state["cash"],
-                        "trade_value": trade_value
-                    }
-                trade_results[ticker] = trade_result
-                
-            elif signal == 'sell':
-                position = self.state["positions"].get(ticker, {"shares": 0})
-                shares_to_sell = min(position["shares"], quantity)
+        position_allocations = np.minimum((position_sizing * 2.0) * confidences, max_position)
+        trade_values = portfolio_value * position_allocations
+        quantities = trade_values / prices
+        
+        sell_idx = np.flatnonzero([analysis_results[ticker]["signal"] == 'sell' for ticker in tickers_ok])
+        owned_shares = self._pos_shares[[self._ticker_idx[tickers_ok[k]] for k in sell_idx]]
+        shares_to_sell_all = quantities.copy()
+        shares_to_sell_all[sell_idx] = np.minimum(owned_shares, quantities[sell_idx])
+        
+        # One log append and one state snapshot for the whole batch of trades
+        with self.batched_trades():
+            for ticker, trade_value, quantity, shares_to_sell in zip(
+                tickers_ok, trade_values.tolist(), quantities.tolist(), shares_to_sell_all.tolist()
+            ):
+                analysis = analysis_results[ticker]
+                signal = analysis["signal"]
+                confidence = analysis["confidence"]
+                price = analysis["current_price"]
                 
-                if shares_to_sell > 0:
-                    trade_result = self.execute_trade(
-                        ticker=ticker,
-                        action='sell',
-                        confidence=confidence,
-                        price=price,
-                        quantity=shares_to_sell
-                    )
+                if signal == 'buy':
+                    if trade_value <= cash:
+                        trade_result = execute_trade(
+                            ticker=ticker,
+                            action='buy',
+                            confidence=confidence,
+                            price=price,
+                            quantity=quantity,
+                            autosave=False
+                        )
+                        cash = state["cash"]
+                    else:
+                        trade_result = TradeSignal(
+                            ticker, "buy_signal", confidence, price, "insufficient_cash",
+                            cash_available=cash, trade_value=trade_value
+                        )
+                    trade_items.append((ticker, trade_result))
+                    
+                elif signal == 'sell':
+                    if shares_to_sell > 0:
+                        trade_result = execute_trade(
+                            ticker=ticker,
+                            action='sell',
+                            confidence=confidence,
+                            price=price,
+                            quantity=shares_to_sell,
+                            autosave=False
+                        )
+                        cash = state["cash"]
+                    else:
+                        trade_result = TradeSignal(ticker, "sell_signal", confidence, price, "no_position")
+                    trade_items.append((ticker, trade_result))
+                    
                 else:
-                    trade_result = {
-                        "ticker": ticker,
-                        "action": "sell_signal",  
-                        "confidence": confidence,
-                        "price": price,
-                        "quantity": 0,
-                        "value": 0,
-                        "status": "no_position"
-                    }
-                trade_results[ticker] = trade_result
-                
-            else:
-                trade_result = self.execute_trade(
-                    ticker=ticker,
-                    action='hold',
-                    confidence=confidence,
-                    price=price
-                )
-                trade_results[ticker] = trade_result
-        
-        self.state["status"] = "active"
-        self._save_state()
+                    trade_items.append((ticker, None))
+                    holds.append((ticker, confidence, price))
+            
+            hold_results = self.execute_holds(holds)
+            for k, (ticker, trade) in enumerate(trade_items):
+                if trade is None:
+                    trade = hold_results[ticker]
+                trade_items[k] = (ticker, trade.to_dict())
+            trade_results = dict(trade_items)
+            
+            if state["status"] != "active":
+                state["status"] = "active"
+                self._state_dirty = True
         
         return {
             "analysis": analysis_results,
             "trades": trade_results,
             "portfolio": {
-                "cash": self.state["cash"],
-                "positions": self.state["positions"],
-                "value": self.state["portfolio_value"]
+                "cash": cash,
+                "positions": positions,
+                "value": state["portfolio_value"]
+            }
+        }
+
+
+def _training_devices() -> List[int]:
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    import tensorflow as tf
+    return list(range(len(tf.config.list_physical_devices('GPU'))))
+
+
+def _pin_training_device(device_queue) -> None:
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(device_queue.get())
+
+
+def _fit_ticker_models(ticker: str,
+                       lstm_path: str,
+                       transformer_path: str,
+                       split: Tuple[np.ndarray, ...]) -> Tuple[Any, Any, Dict[str, Any], Tuple[Optional[str], Optional[str]], List[str]]:
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    from models.lstm_model import LSTMModel
+    from models.transformer_model import TransformerModel
+    
+    lines = [f"\nTraining models for {ticker}..."]
+    quantized = [None, None]
+    
+    try:
+        X_train, y_train, X_val, y_val, X_test, y_test = split
+        
+        input_shape = (X_train.shape[1], X_train.shape[2])
+        lstm_model = LSTMModel(input_shape=input_shape, model_path=None)
+        lstm_model.train(X_train, y_train, X_val, y_val, save_path=lstm_path)
+        
+        transformer_model = TransformerModel(
+            input_shape=input_shape, 
+            model_path=None
+        )
+        transformer_model.train(X_train, y_train, X_val, y_val, save_path=transformer_path)
+        
+        lstm_eval = lstm_model.evaluate(X_test, y_test)
+        transformer_eval = transformer_model.evaluate(X_test, y_test)
+        
+        # The LSTM gets weight-only int8; the transformer is calibrated on
+        # X_train so its matmuls run with int8 activations too.
+        exports = (
+            (lstm_model, lstm_path, None),
+            (transformer_model, transformer_path, X_train)
+        )
+        for k, (model, model_path, calibration_data) in enumerate(exports):
+            try:
+                quantized[k] = model.export_tflite(
+                    os.path.join(os.path.dirname(model_path), QUANTIZED_MODEL_FILE), calibration_data
+                )
+            except Exception as e:
+                lines.append(f"Error quantizing {model_path} for {ticker}: {e}")
+        
+        result = {
+            "status": "success",
+            "lstm_eval": lstm_eval,
+            "transformer_eval": transformer_eval,
+            "data_shape": {
+                "X_train": X_train.shape,
+                "y_train": y_train.shape,
+                "X_val": X_val.shape,
+                "y_val": y_val.shape,
+                "X_test": X_test.shape,
+                "y_test": y_test.shape
             }
         }
+        
+        lines.append(f"Training for {ticker} completed successfully!")
+        lines.append(f"LSTM model accuracy: {lstm_eval['accuracy']:.4f}")
+        lines.append(f"Transformer model accuracy: {transformer_eval['accuracy']:.4f}")
+        return lstm_model, transformer_model, result, tuple(quantized), lines
+    
+    except Exception as e:
+        lines.append(f"Error training models for {ticker}: {e}")
+        return None, None, {"status": "error", "error": str(e)}, tuple(quantized), lines
+
+
+def _fit_ticker_models_worker(*args) -> Tuple[Any, ...]:
+    # Keras models do not pickle back to the parent; it reloads them from the saved files
+    _, _, result, quantized, lines = _fit_ticker_models(*args)
+    return None, None, result, quantized, lines
+
+
+def fit_training_jobs(jobs: List[Tuple[str, str, str, Tuple[np.ndarray, ...]]]) -> List[Tuple[Any, ...]]:
+    # Fits and saves models only, so it can run in a worker process while the
+    # calling agent keeps its state and training log to itself.
+    return [_fit_ticker_models_worker(*job) for job in jobs]
+
+
+def _run_agent(spec: Tuple[str, List[str], str, Dict[str, Any]]) -> Dict[str, Any]:
+    agent_id, tickers, personality, shared_signals = spec
+    result = MLAgent(agent_id, tickers, personality).run(shared_signals)
+    # pool workers exit without running atexit hooks
+    flush_state_writes()
+    return result
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    
     tickers = ["AMZN", "NVDA", "MU", "WMT", "DIS"]
     
     agents = {
-        "conservative": MLAgent("conservative_agent", tickers, "conservative"),
-        "balanced": MLAgent("balanced_agent", tickers, "balanced"),
-        "aggressive": MLAgent("aggressive_agent", tickers, "aggressive"),
-        "trend": MLAgent("trend_agent", tickers, "trend")
+        "conservative": ("conservative_agent", tickers, "conservative"),
+        "balanced": ("balanced_agent", tickers, "balanced"),
+        "aggressive": ("aggressive_agent", tickers, "aggressive"),
+        "trend": ("trend_agent", tickers, "trend")
     }
     
-    for name, agent in agents.items():
-        print(f"\n\nRunning {name} agent...")
-        results = agent.run()
-        
+    # The agents share one models directory, so train it once up front rather
+    # than letting every worker race to write the same model files. The same
+    # agent then scores every ticker once; personalities only differ in how
+    # they weigh and size those signals.
+    scorer = MLAgent(*agents["conservative"])
+    scorer.train_models()
+    shared_signals = scorer.collect_signals()
+    
+    logger.info("Running agents: %s...", ", ".join(agents))
+    specs = [spec + (shared_signals,) for spec in agents.values()]
+    # Let the state writer go idle before any worker starts, and spawn rather
+    # than fork so no child inherits its lock mid-write.
+    flush_state_writes()
+    with ProcessPoolExecutor(max_workers=len(agents), mp_context=multiprocessing.get_context("spawn")) as executor:
+        all_results = dict(zip(agents, executor.map(_run_agent, specs)))
+    
+    for name, results in all_results.items():
         portfolio = results["portfolio"]
-        print(f"\nPortfolio Summary for {name}:")
-        print(f"Cash: ${portfolio['cash']:.2f}")
-        print(f"Portfolio Value: ${portfolio['value']:.2f}")
-        print("Positions:")
+        logger.info("Portfolio Summary for %s:", name)
+        logger.info("Cash: $%.2f", portfolio["cash"])
+        logger.info("Portfolio Value: $%.2f", portfolio["value"])
+        logger.info("Positions:")
         for ticker, position in portfolio["positions"].items():
-            print(f"  {ticker}: {position['shares']:.2f} shares @ ${position['avg_price']:.2f}")
\ No newline at end of file
+            logger.info("  %s: %.2f shares @ $%.2f", ticker, position["shares"], position["cost_basis"])
\ No newline at end of file
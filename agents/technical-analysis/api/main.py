@@ -1,24 +1,74 @@
 import os
 import sys
 import json
-from typing import Dict, List, Any, Optional
+import hashlib
+from typing import Dict, List, Any, Optional, Tuple, FrozenSet, Iterator
 from datetime import datetime, timedelta
+import time
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import asyncio
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from agents.ml_agent import MLAgent
+from agents.ml_agent import MLAgent, fit_training_jobs
 from data.data_loader import DataLoader
 
+# Newer FastAPI serializes response models straight to bytes and deprecates
+# ORJSONResponse, so it is only the default where that is not the case.
+if orjson is None or getattr(ORJSONResponse, "__deprecated__", None):
+    RESPONSE_CLASS = JSONResponse
+else:
+    RESPONSE_CLASS = ORJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global TRAIN_POOL
+    log_listener = make_log_listener()
+    log_listener.start()
+    
+    # Created by the serving process on startup, not by every import of this module
+    for directory in (MODELS_DIR, LOGS_DIR, CACHE_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+    
+    await initialize_agents()
+    TRAIN_POOL = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    # Builds and caches the OpenAPI document so /docs is not the first caller
+    app.openapi()
+    
+    scheduler.add_job(run_daily_analysis, 'cron', hour=0, minute=0)
+    scheduler.start()
+    try:
+        yield
+    finally:
+        scheduler.shutdown()
+        ANALYSIS_EXECUTOR.shutdown(wait=False)
+        TRAIN_POOL.shutdown(wait=False)
+        log_listener.stop()
+
 app = FastAPI(
     title="Technical Analysis Agent API",
     description="AI-powered technical analysis agents for stock trading",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RESPONSE_CLASS
 )
 
 app.add_middleware(
@@ -31,18 +81,57 @@ app.add_middleware(
 
 TICKERS = ["AMZN", "NVDA", "MU", "WMT", "DIS"]
 PERSONALITIES = ["conservative", "balanced", "aggressive", "trend"]
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODELS_DIR = os.path.join(BASE_DIR, "models")
-LOGS_DIR = os.path.join(BASE_DIR, "logs")
-CACHE_DIR = os.path.join(BASE_DIR, "cache")
+# Hashed lookups for request validation; the lists keep their order for agents
+SUPPORTED_TICKERS: FrozenSet[str] = frozenset(TICKERS)
+BASE_DIR = Path(__file__).resolve().parents[1]
+MODELS_DIR = BASE_DIR / "models"
+LOGS_DIR = BASE_DIR / "logs"
+CACHE_DIR = BASE_DIR / "cache"
+
+logger = logging.getLogger("ta.api")
+logger.setLevel(logging.INFO)
+# Handlers only enqueue records; the listener started in lifespan formats and
+# writes them on its own thread so request handlers never block on stdout.
+_LOG_QUEUE: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+logger.addHandler(QueueHandler(_LOG_QUEUE))
+logger.propagate = False
 
-os.makedirs(MODELS_DIR, exist_ok=True)
-os.makedirs(LOGS_DIR, exist_ok=True)
-os.makedirs(CACHE_DIR, exist_ok=True)
+def make_log_listener() -> QueueListener:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    return QueueListener(_LOG_QUEUE, handler)
 
 agents = {}
 data_loader = None
 
+# One worker per personality so a request can analyze every agent at once
+ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=len(PERSONALITIES))
+# Full runs (training + trading) are heavier, so fewer overlap
+DAILY_RUN_CONCURRENCY = 2
+# Training runs in a separate process so it holds neither the GIL nor the
+# event loop. One worker: every agent writes the same per-ticker model files.
+TRAIN_POOL: Optional[ProcessPoolExecutor] = None
+
+RESPONSE_TTL = 60.0
+STATUS_TTL = 2.0
+# "analysis:AMZN" -> (expiry, (response, etag)); "prediction:AMZN" / "status:<agent>" -> (expiry, response)
+_RESPONSE_CACHE: Dict[str, Tuple[float, Any]] = {}
+FULL_ANALYSIS_TTL = 30.0
+# agent_id -> (monotonic expiry, analyze() result covering every ticker)
+_FULL_ANALYSIS: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# agent_id -> (generation it started in, analyze() already running), awaited by
+# every request that needs it
+_INFLIGHT_ANALYSIS: Dict[str, Tuple[int, "asyncio.Future[Dict[str, Any]]"]] = {}
+# Bumped on invalidation so analyses started before it are not cached afterwards
+_cache_generation = 0
+# (agent_id, last_analysis_time, agent), rebuilt whenever an analysis or run
+# finishes so /predict does not read every agent's state dict per request
+_agent_snapshot: List[Tuple[str, Optional[str], MLAgent]] = []
+# Held from the POST until the background run finishes, so repeated POSTs
+# coalesce into the run already queued instead of stacking copies of it
+_RUN_LOCKS: Dict[str, asyncio.Lock] = {}
+_TRAIN_LOCK: Optional[asyncio.Lock] = None
+
 scheduler = AsyncIOScheduler()
 
 class AgentResponse(BaseModel):
@@ -79,38 +168,165 @@ class HistoryEntry(BaseModel):
     quantity: Optional[float] = None
     value: Optional[float] = None
 
+def construct(model_cls, **fields):
+    # Skips validation for data built in-process; FastAPI still checks the
+    # response against response_model. Pydantic 1 names this construct().
+    build = getattr(model_cls, "model_construct", None) or model_cls.construct
+    return build(**fields)
+
+def cached_response(key: str) -> Optional[Any]:
+    entry = _RESPONSE_CACHE.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+def cache_response(key: str, response: Any, ttl: float = RESPONSE_TTL, generation: Optional[int] = None) -> Any:
+    # A response built from analyses started before an invalidation is still
+    # returned, just not cached past it
+    if generation is None or generation == _cache_generation:
+        _RESPONSE_CACHE[key] = (time.monotonic() + ttl, response)
+    return response
+
+def invalidate_responses() -> None:
+    global _cache_generation
+    _cache_generation += 1
+    _RESPONSE_CACHE.clear()
+    _FULL_ANALYSIS.clear()
+
+def analysis_etag(ticker: str, results: Dict[str, Any]) -> str:
+    latest = max(str(result.timestamp) for result in results.values())
+    digest = hashlib.blake2b(f"{ticker}:{latest}".encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+HISTORY_FIELDS = tuple(getattr(HistoryEntry, "model_fields", None) or HistoryEntry.__fields__)
+
+def dump_json(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=str).encode()
+
+def iter_history_json(agent: MLAgent, days: int) -> Iterator[bytes]:
+    # Same JSON array the HistoryEntry response model produced, written one
+    # entry at a time instead of building the whole list first.
+    separator = b"["
+    for entry in agent.iter_history(days=days):
+        yield separator + dump_json({field: entry.get(field) for field in HISTORY_FIELDS})
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
 def get_agent(agent_id: str) -> MLAgent:
     if agent_id not in agents:
         raise HTTPException(status_code=404, detail=f"Agent {agent_id} not found")
     return agents[agent_id]
 
 async def initialize_agents():
-    global agents, data_loader
+    global agents, data_loader, _TRAIN_LOCK
     
-    data_loader = DataLoader(TICKERS, cache_dir=CACHE_DIR)
+    data_loader = DataLoader(TICKERS, cache_dir=str(CACHE_DIR))
     
-    for personality in PERSONALITIES:
-        agent_id = f"{personality}_agent"
-        agents[agent_id] = MLAgent(
-            agent_id=agent_id,
+    def make_agent(personality: str) -> MLAgent:
+        return MLAgent(
+            agent_id=f"{personality}_agent",
             tickers=TICKERS,
             personality=personality,
-            models_dir=MODELS_DIR,
-            log_dir=LOGS_DIR,
-            data_cache_dir=CACHE_DIR
+            models_dir=str(MODELS_DIR),
+            log_dir=str(LOGS_DIR),
+            data_cache_dir=str(CACHE_DIR),
+            data_loader=data_loader
         )
     
-    print(f"Initialized {len(agents)} agents")
+    # Each constructor reads its saved state and model directories, so they overlap
+    loop = asyncio.get_running_loop()
+    created = await asyncio.gather(
+        *[loop.run_in_executor(ANALYSIS_EXECUTOR, make_agent, personality) for personality in PERSONALITIES]
+    )
+    for agent in created:
+        agents[agent.agent_id] = agent
+        _RUN_LOCKS[agent.agent_id] = asyncio.Lock()
+    _TRAIN_LOCK = asyncio.Lock()
+    refresh_agent_snapshot()
+    
+    logger.info("Initialized %d agents", len(agents))
+
+def fit_in_train_pool(jobs: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+    return TRAIN_POOL.submit(fit_training_jobs, jobs).result()
+
+def refresh_agent_snapshot() -> None:
+    global _agent_snapshot
+    _agent_snapshot = [
+        (agent_id, agent.state.get("last_analysis_time"), agent)
+        for agent_id, agent in agents.items()
+    ]
+
+def _finish_inflight(agent_id: str, future: "asyncio.Future[Dict[str, Any]]") -> None:
+    entry = _INFLIGHT_ANALYSIS.get(agent_id)
+    if entry is not None and entry[1] is future:
+        del _INFLIGHT_ANALYSIS[agent_id]
+
+async def analyze_agents(selected: Dict[str, MLAgent]) -> Tuple[Dict[str, Any], int]:
+    # analyze() covers every ticker, so one fresh run per agent serves requests
+    # for any of them until it expires. Also returns the oldest cache generation
+    # the results were started in, so callers can tell whether to cache them.
+    now = time.monotonic()
+    oldest = _cache_generation
+    results = {}
+    stale = []
+    for agent_id in selected:
+        entry = _FULL_ANALYSIS.get(agent_id)
+        if entry is not None and entry[0] >= now:
+            results[agent_id] = entry[1]
+        else:
+            stale.append(agent_id)
+    
+    if stale:
+        loop = asyncio.get_running_loop()
+        generations = []
+        futures = []
+        for agent_id in stale:
+            entry = _INFLIGHT_ANALYSIS.get(agent_id)
+            if entry is None:
+                future = loop.run_in_executor(ANALYSIS_EXECUTOR, selected[agent_id].analyze)
+                entry = _INFLIGHT_ANALYSIS[agent_id] = (_cache_generation, future)
+                future.add_done_callback(partial(_finish_inflight, agent_id))
+            generations.append(entry[0])
+            oldest = min(oldest, entry[0])
+            # shield: a disconnecting client must not cancel a run others await
+            futures.append(asyncio.shield(entry[1]))
+        
+        outcomes = await asyncio.gather(*futures, return_exceptions=True)
+        expires = time.monotonic() + FULL_ANALYSIS_TTL
+        for agent_id, generation, outcome in zip(stale, generations, outcomes):
+            if not isinstance(outcome, Exception) and generation == _cache_generation:
+                _FULL_ANALYSIS[agent_id] = (expires, outcome)
+            results[agent_id] = outcome
+        refresh_agent_snapshot()
+    
+    return {agent_id: results[agent_id] for agent_id in selected}, oldest
 
 async def run_daily_analysis():
-    print("Running scheduled daily analysis...")
+    logger.info("Running scheduled daily analysis...")
     
-    for agent_id, agent in agents.items():
-        try:
-            result = agent.run()
-            print(f"Agent {agent_id} analysis completed")
-        except Exception as e:
-            print(f"Error running agent {agent_id}: {e}")
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(DAILY_RUN_CONCURRENCY)
+    
+    async def run_one(agent_id: str, agent: MLAgent):
+        async with semaphore, _RUN_LOCKS[agent_id]:
+            try:
+                await loop.run_in_executor(ANALYSIS_EXECUTOR, agent.run)
+                logger.info("Agent %s analysis completed", agent_id)
+            except Exception as e:
+                logger.error("Error running agent %s: %s", agent_id, e)
+    
+    await asyncio.gather(*[run_one(agent_id, agent) for agent_id, agent in agents.items()])
+    
+    refresh_agent_snapshot()
+    invalidate_responses()
 
 @app.get("/")
 async def root():
@@ -123,38 +339,66 @@ async def list_agents():
 @app.get("/agents/{agent_id}", response_model=AgentResponse)
 async def get_agent_status(agent_id: str):
     agent = get_agent(agent_id)
+    
+    cache_key = f"status:{agent_id}"
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    
     status = agent.get_status()
     
-    return AgentResponse(
+    return cache_response(cache_key, AgentResponse(
         agent_id=status["agent_id"],
         status=status["status"],
         last_analysis_time=status["last_analysis_time"],
         portfolio_value=status["portfolio_value"],
         cash=status["cash"],
         positions=status["positions"]
-    )
+    ), ttl=STATUS_TTL)
 
 @app.post("/agents/{agent_id}/run")
 async def run_agent(agent_id: str, background_tasks: BackgroundTasks):
     agent = get_agent(agent_id)
+    run_lock = _RUN_LOCKS[agent_id]
+    if run_lock.locked():
+        return {"message": f"Agent {agent_id} analysis already running"}
+    await run_lock.acquire()
     
-    background_tasks.add_task(agent.run)
+    async def run_and_invalidate():
+        try:
+            await asyncio.get_running_loop().run_in_executor(ANALYSIS_EXECUTOR, agent.run)
+        finally:
+            run_lock.release()
+            refresh_agent_snapshot()
+            invalidate_responses()
+    
+    invalidate_responses()
+    background_tasks.add_task(run_and_invalidate)
     
     return {"message": f"Agent {agent_id} analysis started in background"}
 
 @app.get("/predict/{ticker}")
 async def get_prediction(ticker: str):
-    if ticker not in TICKERS:
+    if ticker not in SUPPORTED_TICKERS:
         raise HTTPException(status_code=404, detail=f"Ticker {ticker} not supported")
     
+    cache_key = f"prediction:{ticker}"
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    
     results = {}
     
-    for agent_id, agent in agents.items():
-        if agent.state.get("last_analysis_time") is None:
-            continue
-        
+    analyzed = {
+        agent_id: agent for agent_id, analyzed_at, agent in _agent_snapshot
+        if analyzed_at is not None
+    }
+    
+    analyses, generation = await analyze_agents(analyzed)
+    for agent_id, analysis in analyses.items():
         try:
-            analysis = agent.analyze()
+            if isinstance(analysis, Exception):
+                raise analysis
             if ticker in analysis and analysis[ticker]["status"] == "success":
                 ticker_analysis = analysis[ticker]
                 results[agent_id] = {
@@ -164,12 +408,15 @@ async def get_prediction(ticker: str):
                     "timestamp": ticker_analysis["analysis_time"]
                 }
         except Exception as e:
-            print(f"Error getting prediction for {ticker} from {agent_id}: {e}")
+            logger.error("Error getting prediction for %s from %s: %s", ticker, agent_id, e)
     
     if not results:
         try:
-            agent = agents["balanced_agent"]
-            analysis = agent.analyze()
+            analyses, fallback_generation = await analyze_agents({"balanced_agent": agents["balanced_agent"]})
+            generation = min(generation, fallback_generation)
+            analysis = analyses["balanced_agent"]
+            if isinstance(analysis, Exception):
+                raise analysis
             if ticker in analysis and analysis[ticker]["status"] == "success":
                 ticker_analysis = analysis[ticker]
                 results["balanced_agent"] = {
@@ -179,27 +426,39 @@ async def get_prediction(ticker: str):
                     "timestamp": ticker_analysis["analysis_time"]
                 }
         except Exception as e:
-            print(f"Error getting new prediction for {ticker}: {e}")
+            logger.error("Error getting new prediction for %s: %s", ticker, e)
     
     if not results:
         raise HTTPException(status_code=404, detail=f"No predictions available for {ticker}")
     
-    return results
+    return cache_response(cache_key, results, generation=generation)
 
 @app.get("/analysis/{ticker}", response_model=Dict[str, AnalysisResponse])
-async def get_analysis(ticker: str):
-    if ticker not in TICKERS:
+async def get_analysis(ticker: str, request: Request, response: Response):
+    if ticker not in SUPPORTED_TICKERS:
         raise HTTPException(status_code=404, detail=f"Ticker {ticker} not supported")
     
+    cache_key = f"analysis:{ticker}"
+    cached = cached_response(cache_key)
+    if cached is not None:
+        results, etag = cached
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return results
+    
     results = {}
     
-    for agent_id, agent in agents.items():
+    analyses, generation = await analyze_agents(agents)
+    for agent_id, analysis in analyses.items():
         try:
-            analysis = agent.analyze()
+            if isinstance(analysis, Exception):
+                raise analysis
             
             if ticker in analysis and analysis[ticker]["status"] == "success":
                 ticker_analysis = analysis[ticker]
-                results[agent_id] = AnalysisResponse(
+                results[agent_id] = construct(
+                    AnalysisResponse,
                     ticker=ticker,
                     current_price=ticker_analysis["current_price"],
                     signal=ticker_analysis["signal"],
@@ -209,44 +468,82 @@ async def get_analysis(ticker: str):
                     timestamp=ticker_analysis["analysis_time"]
                 )
         except Exception as e:
-            print(f"Error analyzing {ticker} with {agent_id}: {e}")
+            logger.error("Error analyzing %s with %s: %s", ticker, agent_id, e)
     
     if not results:
         raise HTTPException(status_code=500, detail=f"Failed to analyze {ticker}")
     
+    etag = analysis_etag(ticker, results)
+    cache_response(cache_key, (results, etag), generation=generation)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return results
 
 @app.get("/agents/{agent_id}/history", response_model=List[HistoryEntry])
 async def get_agent_history(agent_id: str, days: int = 7):
     agent = get_agent(agent_id)
-    history = agent.get_history(days=days)
     
-    return [HistoryEntry(**entry) for entry in history]
+    return StreamingResponse(iter_history_json(agent, days), media_type="application/json")
 
 @app.post("/train")
 async def train_models(background_tasks: BackgroundTasks, force: bool = False):
+    train_lock = _TRAIN_LOCK
+    if train_lock.locked():
+        return {"message": "Model training already running"}
+    await train_lock.acquire()
+    
     async def train_all():
-        for agent_id, agent in agents.items():
-            try:
-                print(f"Training models for {agent_id}...")
-                agent.train_models(force_retrain=force)
-            except Exception as e:
-                print(f"Error training models for {agent_id}: {e}")
+        loop = asyncio.get_running_loop()
+        try:
+            retrain = force
+            for agent_id, agent in agents.items():
+                try:
+                    logger.info("Training models for %s...", agent_id)
+                    # Picks up the files the previous agents fitted, so only the
+                    # first agent fits and the rest load its models
+                    await loop.run_in_executor(ANALYSIS_EXECUTOR, agent.refresh_models)
+                    # The agent prepares data and logs the run here; only the
+                    # fitting moves to the training process.
+                    await loop.run_in_executor(
+                        ANALYSIS_EXECUTOR,
+                        partial(agent.train_models, force_retrain=retrain, fit_jobs=fit_in_train_pool)
+                    )
+                    retrain = False
+                except Exception as e:
+                    logger.error("Error training models for %s: %s", agent_id, e)
+            
+            for agent in agents.values():
+                agent.refresh_models()
+        finally:
+            train_lock.release()
+            invalidate_responses()
     
+    invalidate_responses()
     background_tasks.add_task(train_all)
     
     return {"message": "Model training started in background"}
 
-@app.on_event("startup")
-async def startup_event():
-    await initialize_agents()
-    
-    scheduler.add_job(run_daily_analysis, 'cron', hour=0, minute=0)
-    scheduler.start()
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    scheduler.shutdown()
+# Builds the response models' JSON schemas and serializers now rather than
+# on the first request that returns them.
+for response_model in (AgentResponse, PredictionResponse, AnalysisResponse, HistoryEntry):
+    if hasattr(response_model, "model_json_schema"):
+        response_model.model_json_schema()
+        response_model.model_construct().model_dump()
+    else:
+        response_model.schema()
+        response_model.construct().dict()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8100, reload=True)
\ No newline at end of file
+    # Every worker process builds its own agents and scheduler, and they all
+    # write the same state files, so extra workers are opt-in.
+    reload = os.getenv("RELOAD", "1") == "1"
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8100,
+        loop="auto",
+        http="auto",
+        reload=reload,
+        workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
\ No newline at end of file
@@ -5,13 +5,22 @@ import numpy as np
 import matplotlib.pyplot as plt
 from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime, timedelta
-import copy
 import json
 import time
 
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from agents.ml_agent import MLAgent
+from agents.ml_agent import (
+    MLAgent, ACTIONS, ANALYSIS_COLUMNS, indicator_mask, technical_signals, trailing_return_table
+)
 from data.data_loader import DataLoader
 
 DEFAULT_TICKERS = ["AMZN", "NVDA", "MU", "WMT", "DIS"]
@@ -21,6 +30,103 @@ MODELS_DIR = os.path.join(BASE_DIR, "models")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
 CACHE_DIR = os.path.join(BASE_DIR, "cache")
 BACKTEST_DIR = os.path.join(BASE_DIR, "backtest_results")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+BUY, SELL, HOLD = range(3)
+# Days of history a ticker needs before it gets anything but a hold
+MIN_HISTORY = 30
+
+
+# Returns (action code, confidence, lstm says buy, transformer says buy) for
+# one ticker and day. Clamps are explicit comparisons so NaN trends fall to
+# the lower bound as min(hi, max(lo, x)) does.
+@njit(cache=True)
+def _combine_signals(short_trend, medium_trend, long_trend, tech_code, tech_confidence,
+                     w_lstm, w_transformer, w_technicals, threshold):
+    lstm_offset = -0.45
+    lstm_direction = (short_trend * 0.6) + (medium_trend * 0.4)
+    if lstm_direction * 5 > lstm_offset:
+        lstm_offset = lstm_direction * 5
+    if lstm_offset > 0.45:
+        lstm_offset = 0.45
+    lstm_pred = 0.5 + lstm_offset
+    
+    transformer_offset = -0.48
+    transformer_direction = long_trend * 0.4 + medium_trend * 0.3
+    if transformer_direction * 5 > transformer_offset:
+        transformer_offset = transformer_direction * 5
+    if transformer_offset > 0.48:
+        transformer_offset = 0.48
+    transformer_pred = 0.5 + transformer_offset
+    
+    lstm_buy = lstm_pred > 0.5
+    transformer_buy = transformer_pred > 0.5
+    buy_confidence = 0.0
+    sell_confidence = 0.0
+    
+    if lstm_buy:
+        buy_confidence += (0.5 + abs(lstm_pred - 0.5)) * w_lstm
+    else:
+        sell_confidence += (0.5 + abs(lstm_pred - 0.5)) * w_lstm
+    
+    if transformer_buy:
+        buy_confidence += (0.5 + abs(transformer_pred - 0.5)) * w_transformer
+    else:
+        sell_confidence += (0.5 + abs(transformer_pred - 0.5)) * w_transformer
+    
+    if tech_code == BUY:
+        buy_confidence += tech_confidence * w_technicals
+    elif tech_code == SELL:
+        sell_confidence += tech_confidence * w_technicals
+    
+    if buy_confidence > sell_confidence and buy_confidence > threshold:
+        return BUY, buy_confidence, lstm_buy, transformer_buy
+    if sell_confidence > buy_confidence and sell_confidence > threshold:
+        return SELL, sell_confidence, lstm_buy, transformer_buy
+    return HOLD, 0.5, lstm_buy, transformer_buy
+
+
+@njit(cache=True)
+def _combine_signal_matrix(trends, tech_codes, tech_confidences,
+                           w_lstm, w_transformer, w_technicals, threshold):
+    num_dates, num_tickers = tech_codes.shape
+    codes = np.empty((num_dates, num_tickers), dtype=np.int8)
+    confidences = np.empty((num_dates, num_tickers))
+    lstm_buy = np.empty((num_dates, num_tickers), dtype=np.bool_)
+    transformer_buy = np.empty((num_dates, num_tickers), dtype=np.bool_)
+    
+    for t in range(num_dates):
+        for i in range(num_tickers):
+            code, confidence, lstm_is_buy, transformer_is_buy = _combine_signals(
+                trends[t, i, 0], trends[t, i, 1], trends[t, i, 2], tech_codes[t, i], tech_confidences[t, i],
+                w_lstm, w_transformer, w_technicals, threshold
+            )
+            codes[t, i] = code
+            confidences[t, i] = confidence
+            lstm_buy[t, i] = lstm_is_buy
+            transformer_buy[t, i] = transformer_is_buy
+    
+    return codes, confidences, lstm_buy, transformer_buy
+
+
+_combine_signal_matrix(np.zeros((1, 1, 3)), np.full((1, 1), HOLD, dtype=np.int8), np.zeros((1, 1)),
+                       0.0, 0.0, 0.0, 0.5)
+
+
+def technical_signal_table(df: pd.DataFrame, col_mask: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Row i holds the technical signal computed from the first i + 1 rows
+    num_rows = len(df)
+    codes = np.full(num_rows, HOLD, dtype=np.int8)
+    confidences = np.full(num_rows, 0.5)
+    columns = {name: df[name].to_numpy() for name in ANALYSIS_COLUMNS if name in df.columns}
+    
+    for end in range(MIN_HISTORY, num_rows + 1):
+        signal, confidence = technical_signals(
+            {name: values[:end] for name, values in columns.items()}, col_mask, end
+        )
+        codes[end - 1] = ACTION_CODES[signal]
+        confidences[end - 1] = confidence
+    
+    return codes, confidences
 
 class Backtester:
     
@@ -53,6 +159,24 @@ class Backtester:
         
         self.data_loader = DataLoader(tickers, cache_dir=CACHE_DIR)
         self.historical_data = {}
+        self.column_masks = {}
+        # ticker -> (rows, 3) short/medium/long trailing returns as of each row
+        self.trend_returns = {}
+        # ticker -> (technical action codes, confidences) as of each row
+        self.technical_tables = {}
+        
+        # Aligned (dates x tickers) matrices over every trading date in range,
+        # built by load_historical_data
+        self.trading_dates = pd.DatetimeIndex([])
+        self._date_rows = {}
+        self.close = np.empty((0, len(tickers)))
+        self.has_price = np.empty((0, len(tickers)), dtype=bool)
+        self.has_history = np.empty((0, len(tickers)), dtype=bool)
+        self._trends = np.empty((0, len(tickers), 3))
+        self._tech_codes = np.empty((0, len(tickers)), dtype=np.int8)
+        self._tech_confidences = np.empty((0, len(tickers)))
+        # agent_id -> (codes, confidences, lstm buy, transformer buy) matrices
+        self._signal_matrices = {}
         
         self.results = {}
         
@@ -71,11 +195,62 @@ class Backtester:
             filtered_df = df.loc[mask]
             
             self.historical_data[ticker] = filtered_df
+            self.column_masks[ticker] = indicator_mask(filtered_df.columns)
+            self.trend_returns[ticker] = trailing_return_table(filtered_df['Close'].to_numpy(dtype=np.float64))
+            self.technical_tables[ticker] = technical_signal_table(filtered_df, self.column_masks[ticker])
             
             print(f"Loaded {len(filtered_df)} days of data for {ticker}")
+        
+        self._align_signal_inputs()
             
         return self.historical_data
     
+    def _align_signal_inputs(self) -> None:
+        # Lays every ticker's per-row tables onto the union of trading dates, so
+        # a simulated day reads one row of each matrix instead of slicing frames.
+        dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in self.historical_data.values()))))
+        dates = dates[(dates >= pd.Timestamp(self.start_date)) & (dates <= pd.Timestamp(self.end_date))]
+        num_dates, num_tickers = len(dates), len(self.tickers)
+        
+        self.trading_dates = dates
+        self._date_rows = {date: t for t, date in enumerate(dates)}
+        self.close = np.full((num_dates, num_tickers), np.nan)
+        self.has_price = np.zeros((num_dates, num_tickers), dtype=bool)
+        self.has_history = np.zeros((num_dates, num_tickers), dtype=bool)
+        self._trends = np.full((num_dates, num_tickers, 3), np.nan)
+        self._tech_codes = np.full((num_dates, num_tickers), HOLD, dtype=np.int8)
+        self._tech_confidences = np.full((num_dates, num_tickers), 0.5)
+        self._signal_matrices = {}
+        
+        for i, ticker in enumerate(self.tickers):
+            df = self.historical_data.get(ticker)
+            if df is None or not len(df):
+                continue
+            
+            # Rows of df up to and including each date
+            num_rows = df.index.searchsorted(dates, side="right")
+            last_row = np.maximum(num_rows - 1, 0)
+            self.has_price[:, i] = (num_rows > 0) & (df.index[last_row] == dates)
+            self.close[:, i] = np.where(self.has_price[:, i], df['Close'].to_numpy(dtype=np.float64)[last_row], np.nan)
+            
+            ready = num_rows >= MIN_HISTORY
+            self.has_history[:, i] = ready
+            tech_codes, tech_confidences = self.technical_tables[ticker]
+            self._trends[ready, i] = self.trend_returns[ticker][last_row[ready]]
+            self._tech_codes[ready, i] = tech_codes[last_row[ready]]
+            self._tech_confidences[ready, i] = tech_confidences[last_row[ready]]
+    
+    def _agent_signals(self, agent: MLAgent) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        matrices = self._signal_matrices.get(agent.agent_id)
+        if matrices is None:
+            config = agent.config
+            matrices = _combine_signal_matrix(
+                self._trends, self._tech_codes, self._tech_confidences,
+                config.w_lstm, config.w_transformer, config.w_technicals, config.prediction_threshold
+            )
+            self._signal_matrices[agent.agent_id] = matrices
+        return matrices
+    
     def create_agents(self) -> Dict[str, MLAgent]:
         agents = {}
         
@@ -92,7 +267,8 @@ class Backtester:
                 personality=personality,
                 models_dir=backtest_models_dir,
                 log_dir=backtest_logs_dir,
-                data_cache_dir=CACHE_DIR
+                data_cache_dir=CACHE_DIR,
+                data_loader=self.data_loader
             )
             
         return agents
@@ -115,9 +291,9 @@ class Backtester:
                     confidence = signal_info["confidence"]
                     price = prices[ticker]
                     
-                    position_size = agent.config["position_sizing"]
-                    adjusted_position = position_size * (confidence / 0.5)
-                    position_allocation = min(adjusted_position, agent.config["max_position"])
+                    position_size = agent.config.position_sizing
+                    adjusted_position = position_size * confidence * 2.0
+                    position_allocation = min(adjusted_position, agent.config.max_position)
                     
                     portfolio_value = agent.state["portfolio_value"]
                     trade_value = portfolio_value * position_allocation
@@ -130,15 +306,16 @@ class Backtester:
                                 action='buy',
                                 confidence=confidence,
                                 price=price,
-                                quantity=quantity
+                                quantity=quantity,
+                                autosave=False
                             )
                             
-                            commission_amount = trade_result["value"] * self.commission
+                            commission_amount = trade_result.value * self.commission
                             agent.state["cash"] -= commission_amount
                             agent.state["portfolio_value"] -= commission_amount
                             
-                            trade_result["commission"] = commission_amount
-                            trades[ticker] = trade_result
+                            trades[ticker] = trade_result.to_dict()
+                            trades[ticker]["commission"] = commission_amount
                             
                         else:
                             trades[ticker] = {
@@ -161,15 +338,16 @@ class Backtester:
                                 action='sell',
                                 confidence=confidence,
                                 price=price,
-                                quantity=shares_to_sell
+                                quantity=shares_to_sell,
+                                autosave=False
                             )
                             
-                            commission_amount = trade_result["value"] * self.commission
+                            commission_amount = trade_result.value * self.commission
                             agent.state["cash"] -= commission_amount
                             agent.state["portfolio_value"] -= commission_amount
                             
-                            trade_result["commission"] = commission_amount
-                            trades[ticker] = trade_result
+                            trades[ticker] = trade_result.to_dict()
+                            trades[ticker]["commission"] = commission_amount
                             
                         else:
                             trades[ticker] = {
@@ -199,7 +377,7 @@ class Backtester:
                     "date": day_str,
                     "portfolio_value": portfolio_value,
                     "cash": agent.state["cash"],
-                    "positions": copy.deepcopy(agent.state["positions"]),
+                    "positions": {ticker: dict(position) for ticker, position in agent.state["positions"].items()},
                     "trades": trades
                 }
                 
@@ -213,89 +391,30 @@ class Backtester:
         return day_results
     
     def _generate_signals_for_date(self, agent: MLAgent, date: pd.Timestamp) -> Dict[str, Dict[str, Any]]:
-
-        signals = {}
+        t = self._date_rows[date]
+        codes, confidences, lstm_buy, transformer_buy = self._agent_signals(agent)
+        rows = zip(
+            self.tickers, self.has_history[t].tolist(), codes[t].tolist(), confidences[t].tolist(),
+            lstm_buy[t].tolist(), transformer_buy[t].tolist(), self._tech_codes[t].tolist()
+        )
         
-        for ticker in self.tickers:
-            try:
-                df = self.historical_data[ticker]
-                history_cutoff = df.index <= date
-                historical_df = df.loc[history_cutoff].copy()
-                
-                if len(historical_df) < 30:  
-                    signals[ticker] = {
-                        "signal": "hold",
-                        "confidence": 0.5,
-                        "reason": "insufficient_history"
-                    }
-                    continue
-                
-                tech_signal, tech_confidence = agent._check_technical_signals(historical_df)
-                
-                short_trend = historical_df['Close'].pct_change(5).iloc[-1]
-                medium_trend = historical_df['Close'].pct_change(10).iloc[-1]
-                long_trend = historical_df['Close'].pct_change(20).iloc[-1]
-                
-                lstm_weight_short = 0.6
-                lstm_weight_medium = 0.4
-                
-                lstm_direction = (short_trend * lstm_weight_short) + (medium_trend * lstm_weight_medium)
-                lstm_pred = 0.5 + min(0.45, max(-0.45, lstm_direction * 5))
-                lstm_signal = 'buy' if lstm_pred > 0.5 else 'sell'
-                lstm_confidence = 0.5 + abs(lstm_pred - 0.5)
-                
-
-                transformer_direction = long_trend * 0.4 + medium_trend * 0.3
-                transformer_pred = 0.5 + min(0.48, max(-0.48, transformer_direction * 5))
-                transformer_signal = 'buy' if transformer_pred > 0.5 else 'sell'
-                transformer_confidence = 0.5 + abs(transformer_pred - 0.5)
-                
-
-                weights = agent.config["confidence_weight"]
-                
-                buy_confidence = 0
-                sell_confidence = 0
-                
-                if lstm_signal == 'buy':
-                    buy_confidence += lstm_confidence * weights["lstm"]
-                else:
-                    sell_confidence += lstm_confidence * weights["lstm"]
-                
-                if transformer_signal == 'buy':
-                    buy_confidence += transformer_confidence * weights["transformer"]
-                else:
-                    sell_confidence += transformer_confidence * weights["transformer"]
-                
-                if tech_signal == 'buy':
-                    buy_confidence += tech_confidence * weights["technicals"]
-                elif tech_signal == 'sell':
-                    sell_confidence += tech_confidence * weights["technicals"]
-                
-                final_signal = 'hold'
-                final_confidence = 0.5
-                
-                if buy_confidence > sell_confidence and buy_confidence > agent.config["prediction_threshold"]:
-                    final_signal = 'buy'
-                    final_confidence = buy_confidence
-                elif sell_confidence > buy_confidence and sell_confidence > agent.config["prediction_threshold"]:
-                    final_signal = 'sell'
-                    final_confidence = sell_confidence
-                
-                signals[ticker] = {
-                    "signal": final_signal,
-                    "confidence": final_confidence,
-                    "technical_signal": tech_signal,
-                    "lstm_signal": lstm_signal,
-                    "transformer_signal": transformer_signal
-                }
-                
-            except Exception as e:
-                print(f"Error generating signal for {ticker} on {date}: {e}")
+        signals = {}
+        for ticker, ready, code, confidence, lstm_is_buy, transformer_is_buy, tech_code in rows:
+            if not ready:
                 signals[ticker] = {
                     "signal": "hold",
                     "confidence": 0.5,
-                    "error": str(e)
+                    "reason": "insufficient_history"
                 }
+                continue
+            
+            signals[ticker] = {
+                "signal": ACTIONS[code],
+                "confidence": confidence,
+                "technical_signal": ACTIONS[tech_code],
+                "lstm_signal": 'buy' if lstm_is_buy else 'sell',
+                "transformer_signal": 'buy' if transformer_is_buy else 'sell'
+            }
                 
         return signals
     
@@ -305,13 +424,6 @@ class Backtester:
         
         self.load_historical_data()
         
-
-        trading_dates = set()
-        for ticker, df in self.historical_data.items():
-            trading_dates.update(df.index)
-        trading_dates = sorted(list(trading_dates))
-        
-
         agents = self.create_agents()
         
         results = {
@@ -327,22 +439,15 @@ class Backtester:
             "performance_metrics": {}
         }
         
-        for date in trading_dates:
-
-            if date < pd.Timestamp(self.start_date) or date > pd.Timestamp(self.end_date):
-                continue
-                
+        complete_days = self.has_price.all(axis=1).tolist()
+        for date, complete, close in zip(self.trading_dates, complete_days, self.close.tolist()):
             print(f"Simulating trading day: {date.date()}")
             
-            prices = {}
-            for ticker, df in self.historical_data.items():
-                if date in df.index:
-                    prices[ticker] = df.loc[date, 'Close']
-            
-            if len(prices) != len(self.tickers):
+            if not complete:
                 print(f"Skipping {date.date()} - missing price data for some tickers")
                 continue
             
+            prices = dict(zip(self.tickers, close))
             day_results = self.simulate_day(agents, date, prices)
             
             results["daily_results"].append({
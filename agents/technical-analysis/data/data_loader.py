@@ -1,4 +1,6 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import yfinance as yf
@@ -7,6 +9,74 @@ import ta
 from typing import List, Dict, Tuple, Union, Optional
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 
+INDICATORS = {
+    'sma9': lambda df: ta.trend.sma_indicator(df['Close'], window=9),
+    'sma20': lambda df: ta.trend.sma_indicator(df['Close'], window=20),
+    'sma50': lambda df: ta.trend.sma_indicator(df['Close'], window=50),
+    'sma200': lambda df: ta.trend.sma_indicator(df['Close'], window=200),
+    'ema9': lambda df: ta.trend.ema_indicator(df['Close'], window=9),
+    'ema20': lambda df: ta.trend.ema_indicator(df['Close'], window=20),
+    'ema50': lambda df: ta.trend.ema_indicator(df['Close'], window=50),
+    'rsi14': lambda df: ta.momentum.rsi(df['Close'], window=14),
+    'macd': lambda df: ta.trend.macd(df['Close']),
+    'macd_signal': lambda df: ta.trend.macd_signal(df['Close']),
+    'macd_diff': lambda df: ta.trend.macd_diff(df['Close']),
+    'bb_high': lambda df: ta.volatility.bollinger_hband(df['Close']),
+    'bb_low': lambda df: ta.volatility.bollinger_lband(df['Close']),
+    'bb_mid': lambda df: ta.volatility.bollinger_mavg(df['Close']),
+    'volume_ma20': lambda df: ta.trend.sma_indicator(df['Volume'], window=20),
+    'volume_fi': lambda df: ta.volume.force_index(df['Close'], df['Volume']),
+    'adx': lambda df: ta.trend.adx(df['High'], df['Low'], df['Close']),
+    'cci': lambda df: ta.trend.cci(df['High'], df['Low'], df['Close']),
+    'stoch_k': lambda df: ta.momentum.stoch(df['High'], df['Low'], df['Close']),
+    'stoch_d': lambda df: ta.momentum.stoch_signal(df['High'], df['Low'], df['Close']),
+    'pct_change': lambda df: df['Close'].pct_change(),
+    'target': lambda df: (df['Close'].shift(-1) > df['Close']).astype(int),
+}
+
+# yfinance counts 'Nd' periods in trading rows, so those trim by row count
+PERIOD_UNITS = {'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+DOWNLOAD_WORKERS = 8
+
+# Shared by every DataLoader in the process so agents reading the same tickers
+# reuse one parse of each cache file and one indicator computation per window.
+# cache file -> (mtime, frame); only served while the file was checked today
+_FRAME_CACHE: Dict[str, Tuple[float, pd.DataFrame]] = {}
+# (ticker, columns) -> ((rows, first bar, last bar, last close), frame with indicators)
+_INDICATOR_CACHE: Dict[Tuple[str, Optional[Tuple[str, ...]]], Tuple[Tuple, pd.DataFrame]] = {}
+# cache file -> lock held while the file is read, updated or downloaded
+_CACHE_FILE_LOCKS: Dict[str, threading.Lock] = {}
+_CACHE_FILE_LOCKS_GUARD = threading.Lock()
+
+
+def period_offset(period: str) -> Optional[pd.DateOffset]:
+    for suffix, unit in PERIOD_UNITS.items():
+        count = period[:-len(suffix)]
+        if period.endswith(suffix) and count.isdigit():
+            return pd.DateOffset(**{unit: int(count)})
+    return None
+
+
+def trim_to_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    # Keeps the rows a fresh download of period would return
+    if period.endswith('d') and period[:-1].isdigit():
+        return df.tail(int(period[:-1]))
+    
+    offset = period_offset(period)
+    if offset is None or df.empty:
+        return df
+    dates = pd.to_datetime(df.index, utc=True)
+    return df[dates >= dates[-1] - offset]
+
+
+def _cache_file_lock(cache_file: str) -> threading.Lock:
+    with _CACHE_FILE_LOCKS_GUARD:
+        lock = _CACHE_FILE_LOCKS.get(cache_file)
+        if lock is None:
+            lock = _CACHE_FILE_LOCKS[cache_file] = threading.Lock()
+        return lock
+
+
 class DataLoader:
     
     def __init__(self, tickers: List[str], cache_dir: str = "cache"):
@@ -17,68 +87,133 @@ class DataLoader:
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
     
+    def _load_ticker_data(self,
+                          ticker: str,
+                          period: str,
+                          interval: str,
+                          force_refresh: bool = False) -> Optional[pd.DataFrame]:
+        cache_file = os.path.join(self.cache_dir, f"{ticker}_{period}_{interval}.csv")
+        
+        # Agents share one loader and analyze in parallel, so two threads can
+        # reach the same ticker; they take turns on its cache file.
+        with _cache_file_lock(cache_file):
+            return self._load_cache_file(ticker, period, interval, cache_file, force_refresh)
+    
+    def _load_cache_file(self,
+                         ticker: str,
+                         period: str,
+                         interval: str,
+                         cache_file: str,
+                         force_refresh: bool) -> Optional[pd.DataFrame]:
+        if os.path.exists(cache_file) and not force_refresh:
+            mtime = os.path.getmtime(cache_file)
+            cached = _FRAME_CACHE.get(cache_file)
+            if (cached is not None and cached[0] == mtime
+                    and datetime.fromtimestamp(mtime).date() >= datetime.now().date()):
+                print(f"Loaded cached data for {ticker}")
+                return cached[1].copy()
+            
+            df = pd.read_csv(cache_file, index_col=0, parse_dates=True)
+            print(f"Loaded cached data for {ticker}")
+            df = self._update_cache(ticker, df, period, interval, cache_file)
+            _FRAME_CACHE[cache_file] = (os.path.getmtime(cache_file), df.copy())
+            return df
+        
+        print(f"Downloading data for {ticker}...")
+        try:
+            stock = yf.Ticker(ticker)
+            df = stock.history(period=period, interval=interval)
+            
+            df.to_csv(cache_file)
+            print(f"Data saved to {cache_file}")
+        except Exception as e:
+            print(f"Error downloading {ticker}: {e}")
+            return None
+        
+        return df
+    
+    def _update_cache(self,
+                      ticker: str,
+                      df: pd.DataFrame,
+                      period: str,
+                      interval: str,
+                      cache_file: str) -> pd.DataFrame:
+        last_checked = datetime.fromtimestamp(os.path.getmtime(cache_file)).date()
+        if df.empty or last_checked >= datetime.now().date():
+            return df
+        
+        # Refetch from the last cached bar so a partial bar saved mid-session
+        # is replaced by its final values.
+        start = pd.Timestamp(df.index[-1]).strftime("%Y-%m-%d")
+        try:
+            delta = yf.Ticker(ticker).history(start=start, interval=interval)
+        except Exception as e:
+            print(f"Error updating {ticker}: {e}")
+            delta = None
+        
+        if delta is None or delta.empty:
+            os.utime(cache_file)
+            return df
+        
+        df = pd.concat([df, delta])
+        df = df[~df.index.duplicated(keep='last')]
+        
+        df = trim_to_period(df, period)
+        
+        df.to_csv(cache_file)
+        print(f"Updated {cache_file} with {len(delta)} rows")
+        return df
+    
     def download_historical_data(self, 
                                 period: str = "5y", 
                                 interval: str = "1d", 
                                 force_refresh: bool = False) -> Dict[str, pd.DataFrame]:
-        data = {}
+        def load(ticker):
+            return self._load_ticker_data(ticker, period, interval, force_refresh)
         
-        for ticker in self.tickers:
-            cache_file = os.path.join(self.cache_dir, f"{ticker}_{period}_{interval}.csv")
-            
-            if os.path.exists(cache_file) and not force_refresh:
-                df = pd.read_csv(cache_file, index_col=0, parse_dates=True)
-                print(f"Loaded cached data for {ticker}")
-            else:
-                print(f"Downloading data for {ticker}...")
-                try:
-                    stock = yf.Ticker(ticker)
-                    df = stock.history(period=period, interval=interval)
-                    
-                    df.to_csv(cache_file)
-                    print(f"Data saved to {cache_file}")
-                except Exception as e:
-                    print(f"Error downloading {ticker}: {e}")
-                    continue
-            
-            data[ticker] = df
+        # Different tickers use different cache files and locks, so their fetches overlap.
+        if len(self.tickers) > 1:
+            with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(self.tickers))) as executor:
+                frames = list(executor.map(load, self.tickers))
+        else:
+            frames = [load(ticker) for ticker in self.tickers]
         
-        return data
+        return {ticker: df for ticker, df in zip(self.tickers, frames) if df is not None}
     
-    def add_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        result = df.copy()
-        
-        result['sma9'] = ta.trend.sma_indicator(result['Close'], window=9)
-        result['sma20'] = ta.trend.sma_indicator(result['Close'], window=20)
-        result['sma50'] = ta.trend.sma_indicator(result['Close'], window=50)
-        result['sma200'] = ta.trend.sma_indicator(result['Close'], window=200)
-        
-        result['ema9'] = ta.trend.ema_indicator(result['Close'], window=9)
-        result['ema20'] = ta.trend.ema_indicator(result['Close'], window=20)
-        result['ema50'] = ta.trend.ema_indicator(result['Close'], window=50)
+    def get_last_price(self, ticker: str, period: str = "60d", interval: str = "1d") -> float:
+        df = self._load_ticker_data(ticker, period, interval)
+        if df is None or df.empty:
+            raise KeyError(f"No price data for {ticker}")
         
-        result['rsi14'] = ta.momentum.rsi(result['Close'], window=14)
-        
-        result['macd'] = ta.trend.macd(result['Close'])
-        result['macd_signal'] = ta.trend.macd_signal(result['Close'])
-        result['macd_diff'] = ta.trend.macd_diff(result['Close'])
-        
-        result['bb_high'] = ta.volatility.bollinger_hband(result['Close'])
-        result['bb_low'] = ta.volatility.bollinger_lband(result['Close'])
-        result['bb_mid'] = ta.volatility.bollinger_mavg(result['Close'])
-        
-        result['volume_ma20'] = ta.trend.sma_indicator(result['Volume'], window=20)
-        result['volume_fi'] = ta.volume.force_index(result['Close'], result['Volume'])
+        return float(df['Close'].iat[-1])
+    
+    def add_technical_indicators(self,
+                                 df: pd.DataFrame,
+                                 columns: Optional[List[str]] = None,
+                                 ticker: Optional[str] = None) -> pd.DataFrame:
+        if ticker is not None and not df.empty:
+            cache_key = (ticker, None if columns is None else tuple(columns))
+            fingerprint = (len(df), df.index[0], df.index[-1], df['Close'].iat[-1])
+            cached = _INDICATOR_CACHE.get(cache_key)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1].copy()
+            
+            result = self.add_technical_indicators(df, columns)
+            _INDICATOR_CACHE[cache_key] = (fingerprint, result.copy())
+            return result
         
-        result['adx'] = ta.trend.adx(result['High'], result['Low'], result['Close'])
-        result['cci'] = ta.trend.cci(result['High'], result['Low'], result['Close'])
+        result = df.copy()
         
-        result['stoch_k'] = ta.momentum.stoch(result['High'], result['Low'], result['Close'])
-        result['stoch_d'] = ta.momentum.stoch_signal(result['High'], result['Low'], result['Close'])
+        if columns is None:
+            indicators = INDICATORS
+        else:
+            indicators = [col for col in columns if col in INDICATORS]
         
-        result['pct_change'] = result['Close'].pct_change()
+        for name in indicators:
+            result[name] = INDICATORS[name](result)
         
-        result['target'] = (result['Close'].shift(-1) > result['Close']).astype(int)
+        if columns is not None:
+            return result[[col for col in columns if col in result.columns]]
         
         return result
     
@@ -87,7 +222,7 @@ class DataLoader:
         prepared_data = {}
         
         for ticker, df in raw_data.items():
-            prepared_data[ticker] = self.add_technical_indicators(df)
+            prepared_data[ticker] = self.add_technical_indicators(df, ticker=ticker)
             
         return prepared_data
     
@@ -160,9 +295,9 @@ class DataLoader:
         
         return X_train, y_train, X_val, y_val, X_test, y_test
     
-    def get_latest_data(self, ticker: str, lookback: int = 30) -> np.ndarray:
+    def get_latest_data(self, ticker: str, lookback: int = 30, out: Optional[np.ndarray] = None) -> np.ndarray:
         df = self.download_historical_data(period="60d")[ticker]
-        df = self.add_technical_indicators(df)
+        df = self.add_technical_indicators(df, ticker=ticker)
         
         features_to_check = [col for col in df.columns if col != 'target']
         corr_matrix = df[features_to_check].corr().abs()
@@ -181,6 +316,10 @@ class DataLoader:
         features = normalized_df.drop('target', axis=1).values
         latest_sequence = features[-lookback:].reshape(1, lookback, -1)
         
+        if out is not None:
+            np.copyto(out, latest_sequence.reshape(out.shape))
+            return out
+        
         return latest_sequence
 
 
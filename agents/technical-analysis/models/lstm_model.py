@@ -7,16 +7,32 @@ from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 from tensorflow.keras.optimizers import Adam
 from typing import Tuple, Optional, Dict, Any, List
 
+# Keras only dispatches to the fused cuDNN LSTM kernel when the layer keeps
+# these defaults, so they are pinned explicitly.
+FUSED_LSTM_KWARGS = {
+    'activation': 'tanh',
+    'recurrent_activation': 'sigmoid',
+    'recurrent_dropout': 0.0,
+    'unroll': False,
+    'use_bias': True
+}
+
+
+def as_model_input(X: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
 class LSTMModel:
     
     def __init__(self, 
-                 input_shape: Tuple[int, int],
+                 input_shape: Optional[Tuple[int, int]],
                  output_dim: int = 1,
                  model_path: Optional[str] = None,
                  model_params: Optional[Dict[str, Any]] = None):
         self.input_shape = input_shape
         self.output_dim = output_dim
         self.model_path = model_path
+        self._forward = None
         
         self.model_params = {
             'lstm_units': [128, 64],
@@ -29,9 +45,13 @@ class LSTMModel:
         
         if model_params:
             self.model_params.update(model_params)
-            
+        
         if model_path and os.path.exists(model_path):
             self.model = load_model(model_path)
+            if self.input_shape is None:
+                self.input_shape = tuple(self.model.input_shape[1:])
+        elif input_shape is None:
+            raise ValueError("input_shape is required when no saved model exists")
         else:
             self.model = self._build_model()
     
@@ -45,9 +65,10 @@ class LSTMModel:
             if i == 0:
                 model.add(LSTM(units=units,
                                return_sequences=return_sequences,
-                               input_shape=self.input_shape))
+                               input_shape=self.input_shape,
+                               **FUSED_LSTM_KWARGS))
             else:
-                model.add(LSTM(units=units, return_sequences=return_sequences))
+                model.add(LSTM(units=units, return_sequences=return_sequences, **FUSED_LSTM_KWARGS))
             
             model.add(BatchNormalization())
             model.add(Dropout(self.model_params['dropout_rate']))
@@ -96,8 +117,8 @@ class LSTMModel:
             self.model_path = save_path
         
         history = self.model.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
+            as_model_input(X_train), y_train,
+            validation_data=(as_model_input(X_val), y_val),
             epochs=self.model_params['epochs'],
             batch_size=self.model_params['batch_size'],
             callbacks=callbacks,
@@ -106,14 +127,33 @@ class LSTMModel:
         
         return history.history
     
+    # Traced once into a concrete function so predict() skips tf.function's
+    # per-call signature matching and goes straight to the graph.
+    def _build_forward(self, jit_compile: bool = True):
+        return tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + tuple(self.input_shape), tf.float32)],
+            jit_compile=jit_compile
+        ).get_concrete_function()
+    
     def predict(self, X: np.ndarray) -> np.ndarray:
-        return self.model.predict(X)
+        X = as_model_input(X)
+        if self._forward is None:
+            self._forward = self._build_forward()
+        try:
+            return self._forward(tf.constant(X)).numpy()
+        except (tf.errors.InvalidArgumentError, tf.errors.UnimplementedError):
+            self._forward = self._build_forward(jit_compile=False)
+            return self._forward(tf.constant(X)).numpy()
     
     def evaluate(self, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
+        X_test = as_model_input(X_test)
         loss, accuracy = self.model.evaluate(X_test, y_test)
         
         if self.output_dim == 1:
-            y_pred = self.predict(X_test)
+            # The plain Keras model: routing this through predict() would trace
+            # and compile an inference function for every ticker trained.
+            y_pred = self.model.predict(X_test, verbose=0)
             y_pred_binary = (y_pred > 0.5).astype(int)
             
             true_positives = np.sum((y_test == 1) & (y_pred_binary == 1))
@@ -145,6 +185,33 @@ class LSTMModel:
         self.model.save(path)  
         print(f"Model saved to {path}")
 
+    def export_tflite(self,
+                      path: str,
+                      representative_data: Optional[np.ndarray] = None,
+                      num_samples: int = 100) -> str:
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        
+        if representative_data is None:
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS,
+                tf.lite.OpsSet.SELECT_TF_OPS
+            ]
+        else:
+            samples = as_model_input(representative_data[:num_samples])
+            converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in samples)
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+                tf.lite.OpsSet.SELECT_TF_OPS
+            ]
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        print(f"Quantized model saved to {path}")
+        
+        return path
+
 
 if __name__ == "__main__":
     input_shape = (30, 20)  
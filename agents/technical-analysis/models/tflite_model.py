@@ -0,0 +1,47 @@
+import threading
+import numpy as np
+import tensorflow as tf
+from typing import Tuple
+
+
+class QuantizedModel:
+    
+    def __init__(self, model_path: str, num_threads: int = 1):
+        self.model_path = model_path
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+        
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape: Tuple[int, ...] = tuple(int(dim) for dim in self._input['shape'][1:])
+        self._batch_size = int(self._input['shape'][0])
+    
+    def _quantize(self, X: np.ndarray) -> np.ndarray:
+        dtype = self._input['dtype']
+        scale, zero_point = self._input['quantization']
+        if dtype == np.float32 or not scale:
+            return X.astype(dtype, copy=False)
+        info = np.iinfo(dtype)
+        return np.clip(np.round(X / scale + zero_point), info.min, info.max).astype(dtype)
+    
+    def _dequantize(self, y: np.ndarray) -> np.ndarray:
+        scale, zero_point = self._output['quantization']
+        if y.dtype == np.float32 or not scale:
+            return y.astype(np.float32, copy=False)
+        return (y.astype(np.float32) - zero_point) * scale
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = self._quantize(np.ascontiguousarray(X, dtype=np.float32))
+        
+        with self._lock:
+            # Resize once per batch size; the interpreter keeps the allocation
+            # until a different size comes in.
+            if X.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], X.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = X.shape[0]
+            
+            self.interpreter.set_tensor(self._input['index'], X)
+            self.interpreter.invoke()
+            return self._dequantize(self.interpreter.get_tensor(self._output['index']))
@@ -8,18 +8,21 @@ from tensorflow.keras.layers import (
 )
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 from tensorflow.keras.optimizers import Adam
+from tensorflow.keras import mixed_precision
 from typing import Tuple, Optional, Dict, Any, List
+from models.lstm_model import as_model_input
 
 class TransformerModel:
     
     def __init__(self, 
-                 input_shape: Tuple[int, int],
+                 input_shape: Optional[Tuple[int, int]],
                  output_dim: int = 1,
                  model_path: Optional[str] = None,
                  model_params: Optional[Dict[str, Any]] = None):
         self.input_shape = input_shape
         self.output_dim = output_dim
         self.model_path = model_path
+        self._forward = None
         
         self.model_params = {
             'num_heads': 4,
@@ -28,14 +31,19 @@ class TransformerModel:
             'dropout_rate': 0.2,
             'learning_rate': 0.0005,
             'batch_size': 32,
-            'epochs': 100
+            'epochs': 100,
+            'mixed_precision': None
         }
         
         if model_params:
             self.model_params.update(model_params)
-            
+        
         if model_path and os.path.exists(model_path):
-            self.model = load_model(model_path)
+            self.model = load_model(model_path, custom_objects=CUSTOM_OBJECTS)
+            if self.input_shape is None:
+                self.input_shape = tuple(self.model.input_shape[1:])
+        elif input_shape is None:
+            raise ValueError("input_shape is required when no saved model exists")
         else:
             self.model = self._build_model()
     
@@ -52,7 +60,27 @@ class TransformerModel:
         
         return LayerNormalization(epsilon=1e-6)(attention_output + ffn_output)
     
+    def _use_mixed_precision(self) -> bool:
+        # float16 only pays off where the hardware has fast half-precision
+        # matmuls; on CPU it is slower than float32, so the default (None)
+        # enables it only when a GPU is visible.
+        enabled = self.model_params['mixed_precision']
+        if enabled is None:
+            return bool(tf.config.list_physical_devices('GPU'))
+        return bool(enabled)
+    
     def _build_model(self) -> Model:
+        if not self._use_mixed_precision():
+            return self._build_layers()
+        
+        policy = mixed_precision.global_policy()
+        mixed_precision.set_global_policy('mixed_float16')
+        try:
+            return self._build_layers()
+        finally:
+            mixed_precision.set_global_policy(policy)
+    
+    def _build_layers(self) -> Model:
         num_heads = self.model_params['num_heads']
         key_dim = self.model_params['key_dim']
         ff_dim = self.model_params['ff_dim']
@@ -80,11 +108,11 @@ class TransformerModel:
         x = Dropout(dropout_rate)(x)
         
         if self.output_dim == 1:
-            outputs = Dense(1, activation='sigmoid')(x)
+            outputs = Dense(1, activation='sigmoid', dtype='float32')(x)
             loss = 'binary_crossentropy'
             metrics = ['accuracy']
         else:
-            outputs = Dense(self.output_dim, activation='softmax')(x)
+            outputs = Dense(self.output_dim, activation='softmax', dtype='float32')(x)
             loss = 'categorical_crossentropy'
             metrics = ['accuracy']
         
@@ -135,12 +163,27 @@ class TransformerModel:
         
         return history.history
     
+    # Traced once into a concrete function so predict() skips tf.function's
+    # per-call signature matching and goes straight to the graph.
+    def _build_forward(self, jit_compile: bool = True):
+        return tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + tuple(self.input_shape), tf.float32)],
+            jit_compile=jit_compile
+        ).get_concrete_function()
+    
     def predict(self, X: np.ndarray) -> np.ndarray:
-        X = tf.cast(X, tf.float32)
-        return self.model.predict(X)
+        X = as_model_input(X)
+        if self._forward is None:
+            self._forward = self._build_forward()
+        try:
+            return self._forward(tf.constant(X)).numpy()
+        except (tf.errors.InvalidArgumentError, tf.errors.UnimplementedError):
+            self._forward = self._build_forward(jit_compile=False)
+            return self._forward(tf.constant(X)).numpy()
     
     def evaluate(self, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
-        X_test = tf.cast(X_test, tf.float32)
+        X_test = as_model_input(X_test)
         y_test = tf.cast(y_test, tf.float32)
         return self.model.evaluate(X_test, y_test, return_dict=True)
     
@@ -154,6 +197,24 @@ class TransformerModel:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         self.model.save(path)
 
+    def export_tflite(self, path: str, representative_data: np.ndarray, num_samples: int = 100) -> str:
+        samples = as_model_input(representative_data[:num_samples])
+        
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in samples)
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+            tf.lite.OpsSet.SELECT_TF_OPS
+        ]
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        print(f"Quantized model saved to {path}")
+        
+        return path
+
 
 class CastToFloat32(tf.keras.layers.Layer):
     def call(self, inputs):
@@ -165,6 +226,11 @@ class PositionalEncoding(tf.keras.layers.Layer):
         super(PositionalEncoding, self).__init__(**kwargs)
         self.key_dim = key_dim
 
+    def get_config(self):
+        config = super(PositionalEncoding, self).get_config()
+        config['key_dim'] = self.key_dim
+        return config
+
     def build(self, input_shape):
         length = input_shape[1]  
         position = tf.range(length, dtype=tf.float32)[:, tf.newaxis]
@@ -184,7 +250,14 @@ class PositionalEncoding(tf.keras.layers.Layer):
         self.pe = tf.Variable(pe, trainable=False)
 
     def call(self, inputs):
-        return inputs + tf.broadcast_to(self.pe, [tf.shape(inputs)[0], tf.shape(inputs)[1], self.key_dim])
+        pe = tf.cast(self.pe, inputs.dtype)
+        return inputs + tf.broadcast_to(pe, [tf.shape(inputs)[0], tf.shape(inputs)[1], self.key_dim])
+
+
+CUSTOM_OBJECTS = {
+    'CastToFloat32': CastToFloat32,
+    'PositionalEncoding': PositionalEncoding
+}
 
 
 if __name__ == "__main__":
@@ -38,16 +38,24 @@ def parse_args():
     
     parser.add_argument("--tickers", type=str, nargs="+", default=DEFAULT_TICKERS, 
                         help="Stock tickers to analyze")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print per-ticker progress from the agents")
+    parser.add_argument("--no-ta", action="store_true",
+                        help="Skip technical-signal analysis for every agent")
     
     return parser.parse_args()
 
-def create_agents(tickers: List[str], agent_id: str = None) -> dict:
+def create_agents(tickers: List[str], agent_id: str = None, verbose: bool = False, no_ta: bool = False) -> dict:
     agents = {}
+    use_technicals = False if no_ta else None
     
     os.makedirs(MODELS_DIR, exist_ok=True)
     os.makedirs(LOGS_DIR, exist_ok=True)
     os.makedirs(CACHE_DIR, exist_ok=True)
     
+    # Every personality reads the same tickers, so one loader serves them all
+    data_loader = DataLoader(tickers, cache_dir=CACHE_DIR)
+    
     if agent_id:
         if "_agent" in agent_id:
             personality = agent_id.replace("_agent", "")
@@ -64,7 +72,10 @@ def create_agents(tickers: List[str], agent_id: str = None) -> dict:
             personality=personality,
             models_dir=MODELS_DIR,
             log_dir=LOGS_DIR,
-            data_cache_dir=CACHE_DIR
+            data_cache_dir=CACHE_DIR,
+            verbose=verbose,
+            use_technicals=use_technicals,
+            data_loader=data_loader
         )
     else:
         for personality in DEFAULT_PERSONALITIES:
@@ -75,7 +86,10 @@ def create_agents(tickers: List[str], agent_id: str = None) -> dict:
                 personality=personality,
                 models_dir=MODELS_DIR,
                 log_dir=LOGS_DIR,
-                data_cache_dir=CACHE_DIR
+                data_cache_dir=CACHE_DIR,
+                verbose=verbose,
+                use_technicals=use_technicals,
+                data_loader=data_loader
             )
     
     return agents
@@ -257,7 +271,7 @@ def show_status(agents: dict):
 def main():
     args = parse_args()
     
-    agents = create_agents(args.tickers, args.agent)
+    agents = create_agents(args.tickers, args.agent, args.verbose, args.no_ta)
     
     if args.command == "train":
         run_training(agents, args.force)
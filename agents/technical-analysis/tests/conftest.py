@@ -0,0 +1,33 @@
+import os
+import sys
+import shutil
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import data.data_loader as data_loader
+
+TICKERS = ["AMZN", "NVDA", "MU", "WMT", "DIS"]
+
+
+class OfflineTicker:
+    
+    def __init__(self, ticker):
+        self.ticker = ticker
+    
+    def history(self, **kwargs):
+        raise ConnectionError(f"network disabled in tests ({self.ticker})")
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # A copy of the checked-in price cache, with yfinance cut off so stale
+    # files are served as they are instead of being refreshed.
+    directory = tmp_path / "cache"
+    shutil.copytree(os.path.join(BASE_DIR, "cache"), directory)
+    monkeypatch.setattr(data_loader.yf, "Ticker", OfflineTicker)
+    data_loader._FRAME_CACHE.clear()
+    data_loader._INDICATOR_CACHE.clear()
+    return str(directory)
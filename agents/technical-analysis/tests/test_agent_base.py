@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+
+import pytest
+
+import agents.agent_base as agent_base
+from agents.agent_base import AgentBase, TradeResult, flush_state_writes
+
+
+@pytest.fixture
+def agent(tmp_path):
+    return AgentBase("test_agent", ["AMZN", "NVDA"], models_dir=str(tmp_path / "models"), log_dir=str(tmp_path / "logs"))
+
+
+def state_file(agent):
+    return os.path.join(agent.log_dir, agent.agent_id, "state.json")
+
+
+def test_burst_of_saves_collapses_into_one_write(agent, monkeypatch):
+    writing = threading.Event()
+    release = threading.Event()
+    writes = []
+    replace = os.replace
+    
+    def blocking_replace(src, dst):
+        writes.append(dst)
+        writing.set()
+        release.wait(5)
+        replace(src, dst)
+    
+    monkeypatch.setattr(agent_base.os, "replace", blocking_replace)
+    
+    agent._save_state()
+    assert writing.wait(5)
+    # The writer is stuck on the first snapshot; these all queue behind it
+    for cash in range(10):
+        agent.state["cash"] = float(cash)
+        agent._save_state()
+    release.set()
+    flush_state_writes()
+    
+    assert writes == [state_file(agent)] * 2
+    with open(state_file(agent)) as f:
+        assert json.load(f)["cash"] == 9.0
+
+
+def test_saved_state_is_valid_json(agent):
+    agent.state["positions"]["AMZN"] = {"shares": 3, "cost_basis": 101.5}
+    agent._save_state()
+    flush_state_writes()
+    
+    with open(state_file(agent)) as f:
+        assert json.load(f) == agent.state
+    assert not os.path.exists(state_file(agent) + ".tmp")
+
+
+def test_failed_write_marks_state_dirty(agent, monkeypatch, capsys):
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(agent_base.os, "replace", failing_replace)
+    agent._save_state()
+    flush_state_writes()
+    
+    assert agent._state_dirty
+    assert state_file(agent) in capsys.readouterr().out
+    
+    monkeypatch.undo()
+    agent._save_state()
+    flush_state_writes()
+    
+    assert not agent._state_dirty
+    assert os.path.exists(state_file(agent))
+
+
+def test_batched_trades_write_log_and_state_once(agent, monkeypatch):
+    saves = []
+    save_state = agent._save_state
+    
+    def counting_save_state():
+        saves.append(agent.state["cash"])
+        save_state()
+    
+    monkeypatch.setattr(agent, "_save_state", counting_save_state)
+    
+    with agent.batched_trades():
+        agent.execute_trade("AMZN", "buy", 0.8, 100.0, quantity=10, autosave=False)
+        agent.execute_trade("NVDA", "buy", 0.7, 50.0, quantity=20, autosave=False)
+        agent.execute_trade("AMZN", "sell", 0.6, 110.0, quantity=4, autosave=False)
+        assert agent.history == []
+    flush_state_writes()
+    
+    assert saves == [agent.state["cash"]]
+    assert [action["ticker"] for action in agent.history] == ["AMZN", "NVDA", "AMZN"]
+    assert len({action["timestamp"] for action in agent.history}) == 1
+    
+    log_dir = os.path.join(agent.log_dir, agent.agent_id)
+    (log_name,) = [name for name in os.listdir(log_dir) if name.startswith("actions_")]
+    with open(os.path.join(log_dir, log_name)) as f:
+        assert len(f.readlines()) == 3
+    
+    with open(state_file(agent)) as f:
+        state = json.load(f)
+    assert state["cash"] == pytest.approx(100000.0 - 1000.0 - 1000.0 + 440.0)
+    assert state["positions"]["AMZN"]["shares"] == 6
+
+
+def test_trade_result_round_trips_through_dict():
+    trade = TradeResult("AMZN", "buy", 0.8, 100.0, 10, 1000.0, "success")
+    
+    assert TradeResult(**trade.to_dict()) == trade
+    assert trade.to_dict() == {
+        "ticker": "AMZN",
+        "action": "buy",
+        "confidence": 0.8,
+        "price": 100.0,
+        "quantity": 10,
+        "value": 1000.0,
+        "status": "success"
+    }
+    
+    error = TradeResult.error("AMZN", "sell", 0.6, 100.0, "No position in AMZN")
+    assert error.to_dict() == {"status": "error", "message": "No position in AMZN"}
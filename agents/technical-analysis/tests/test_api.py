@@ -0,0 +1,170 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("apscheduler")
+pytest.importorskip("uvicorn")
+
+import api.main as api
+
+
+class FakeAgent:
+    # Stands in for MLAgent: analyze() can be held open to keep a run in flight
+    
+    def __init__(self, agent_id):
+        self.agent_id = agent_id
+        self.state = {"last_analysis_time": None}
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+    
+    def analyze(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return {
+            "AMZN": {
+                "status": "success",
+                "current_price": 100.0,
+                "signal": "buy",
+                "confidence": 0.7,
+                "model_predictions": {},
+                "technical_signals": {},
+                "analysis_time": f"2024-01-02T00:00:{self.calls:02d}"
+            }
+        }
+
+
+@pytest.fixture
+def agents(monkeypatch):
+    agents = {agent_id: FakeAgent(agent_id) for agent_id in ("balanced_agent", "trend_agent")}
+    monkeypatch.setattr(api, "agents", agents)
+    monkeypatch.setattr(api, "_RESPONSE_CACHE", {})
+    monkeypatch.setattr(api, "_FULL_ANALYSIS", {})
+    monkeypatch.setattr(api, "_INFLIGHT_ANALYSIS", {})
+    monkeypatch.setattr(api, "_agent_snapshot", [])
+    return agents
+
+
+async def get(path, headers=()):
+    messages = []
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    await api.app(scope, receive, send)
+    
+    start = messages[0]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+async def wait_started(*agents):
+    loop = asyncio.get_running_loop()
+    for agent in agents:
+        assert await loop.run_in_executor(None, agent.started.wait, 5)
+
+
+def hold(agents):
+    for agent in agents.values():
+        agent.release.clear()
+
+
+def release(agents):
+    for agent in agents.values():
+        agent.release.set()
+
+
+def test_concurrent_requests_share_one_analysis(agents):
+    async def scenario():
+        hold(agents)
+        first = asyncio.ensure_future(get("/analysis/AMZN"))
+        await wait_started(*agents.values())
+        second = asyncio.ensure_future(get("/analysis/AMZN"))
+        await asyncio.sleep(0.05)
+        release(agents)
+        return await asyncio.gather(first, second)
+    
+    (status1, _, body1), (status2, _, body2) = asyncio.run(scenario())
+    
+    assert status1 == status2 == 200
+    assert body1 == body2
+    assert [agent.calls for agent in agents.values()] == [1, 1]
+
+
+def test_invalidation_keeps_inflight_run_but_does_not_cache_it(agents):
+    async def scenario():
+        hold(agents)
+        first = asyncio.ensure_future(get("/analysis/AMZN"))
+        await wait_started(*agents.values())
+        api.invalidate_responses()
+        # Still coalesces onto the run started before the invalidation
+        second = asyncio.ensure_future(get("/analysis/AMZN"))
+        await asyncio.sleep(0.05)
+        release(agents)
+        await asyncio.gather(first, second)
+        assert [agent.calls for agent in agents.values()] == [1, 1]
+        assert api._FULL_ANALYSIS == {}
+        assert api._RESPONSE_CACHE == {}
+        
+        status, _, _ = await get("/analysis/AMZN")
+        assert status == 200
+        assert [agent.calls for agent in agents.values()] == [2, 2]
+        
+        status, _, _ = await get("/analysis/AMZN")
+        assert status == 200
+        assert [agent.calls for agent in agents.values()] == [2, 2]
+    
+    asyncio.run(scenario())
+
+
+def test_analysis_etag_answers_304(agents):
+    async def scenario():
+        status, headers, body = await get("/analysis/AMZN")
+        assert status == 200
+        etag = headers[b"etag"].decode()
+        assert etag.startswith('W/"')
+        
+        for if_none_match in (etag, f'W/"other", {etag}', "*"):
+            status, headers, body = await get("/analysis/AMZN", [("if-none-match", if_none_match)])
+            assert status == 304, if_none_match
+            assert headers[b"etag"].decode() == etag
+            assert body == b""
+        
+        status, headers, body = await get("/analysis/AMZN", [("if-none-match", 'W/"other"')])
+        assert status == 200
+        assert headers[b"etag"].decode() == etag
+        
+        # A new analysis changes the timestamp and so the tag
+        api.invalidate_responses()
+        status, headers, _ = await get("/analysis/AMZN", [("if-none-match", etag)])
+        assert status == 200
+        assert headers[b"etag"].decode() != etag
+        
+        # A freshly computed response is checked against the header too
+        api.invalidate_responses()
+        status, _, body = await get("/analysis/AMZN", [("if-none-match", "*")])
+        assert status == 304
+        assert body == b""
+    
+    asyncio.run(scenario())
+    assert [agent.calls for agent in agents.values()] == [3, 3]
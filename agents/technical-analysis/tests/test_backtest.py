@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import backtest
+from data.data_loader import DataLoader
+from conftest import TICKERS
+from test_technical_signals import reference_technical_signals
+
+
+def reference_signal(df, config, date):
+    # Per-date pandas version of _generate_signals_for_date from before the
+    # signal matrices, kept as the spec
+    history = df.loc[df.index <= date]
+    if len(history) < 30:
+        return {"signal": "hold", "confidence": 0.5, "reason": "insufficient_history"}
+    
+    tech_signal, tech_confidence = reference_technical_signals(history)
+    
+    close = history['Close']
+    short_trend, medium_trend, long_trend = (
+        close.iloc[-1] / close.iloc[-1 - n] - 1 if len(close) > n else np.nan for n in (5, 10, 20)
+    )
+    
+    lstm_pred = 0.5 + min(0.45, max(-0.45, (short_trend * 0.6 + medium_trend * 0.4) * 5))
+    lstm_signal = 'buy' if lstm_pred > 0.5 else 'sell'
+    lstm_confidence = 0.5 + abs(lstm_pred - 0.5)
+    
+    transformer_pred = 0.5 + min(0.48, max(-0.48, (long_trend * 0.4 + medium_trend * 0.3) * 5))
+    transformer_signal = 'buy' if transformer_pred > 0.5 else 'sell'
+    transformer_confidence = 0.5 + abs(transformer_pred - 0.5)
+    
+    votes = {'buy': 0.0, 'sell': 0.0}
+    votes[lstm_signal] += lstm_confidence * config.w_lstm
+    votes[transformer_signal] += transformer_confidence * config.w_transformer
+    if tech_signal in votes:
+        votes[tech_signal] += tech_confidence * config.w_technicals
+    
+    final_signal, final_confidence = 'hold', 0.5
+    if votes['buy'] > votes['sell'] and votes['buy'] > config.prediction_threshold:
+        final_signal, final_confidence = 'buy', votes['buy']
+    elif votes['sell'] > votes['buy'] and votes['sell'] > config.prediction_threshold:
+        final_signal, final_confidence = 'sell', votes['sell']
+    
+    return {
+        "signal": final_signal,
+        "confidence": final_confidence,
+        "technical_signal": tech_signal,
+        "lstm_signal": lstm_signal,
+        "transformer_signal": transformer_signal
+    }
+
+
+@pytest.fixture
+def backtester(cache_dir, tmp_path):
+    bt = backtest.Backtester(start_date="2022-10-01", end_date="2023-06-30", output_dir=str(tmp_path / "bt"))
+    bt.data_loader = DataLoader(TICKERS, cache_dir=cache_dir)
+    bt.load_historical_data()
+    return bt
+
+
+def test_signals_match_per_date_reference(backtester):
+    agents = backtester.create_agents()
+    assert len(backtester.trading_dates) > 100
+    
+    for agent in agents.values():
+        for date in backtester.trading_dates:
+            signals = backtester._generate_signals_for_date(agent, date)
+            for ticker in TICKERS:
+                expected = reference_signal(backtester.historical_data[ticker], agent.config, date)
+                actual = signals[ticker]
+                assert actual.keys() == expected.keys(), (agent.agent_id, date, ticker)
+                for key, value in expected.items():
+                    if key == "confidence":
+                        assert actual[key] == pytest.approx(value), (agent.agent_id, date, ticker)
+                    else:
+                        assert actual[key] == value, (agent.agent_id, date, ticker, key)
+
+
+def test_close_matrix_matches_frames(backtester):
+    for t, date in enumerate(backtester.trading_dates):
+        for i, ticker in enumerate(TICKERS):
+            df = backtester.historical_data[ticker]
+            assert backtester.has_price[t, i] == (date in df.index)
+            if date in df.index:
+                assert backtester.close[t, i] == df.at[date, 'Close']
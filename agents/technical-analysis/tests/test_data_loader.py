@@ -0,0 +1,53 @@
+import os
+import time
+
+import pandas as pd
+
+import data.data_loader as data_loader
+from data.data_loader import DataLoader, trim_to_period
+
+
+def test_trim_to_period_keeps_trading_rows_for_day_periods():
+    index = pd.bdate_range("2024-01-01", periods=100)
+    df = pd.DataFrame({"Close": range(100)}, index=index)
+    
+    trimmed = trim_to_period(df, "60d")
+    
+    assert len(trimmed) == 60
+    assert trimmed.index[-1] == index[-1]
+
+
+def test_trim_to_period_uses_calendar_span_for_longer_periods():
+    index = pd.bdate_range("2020-01-01", "2024-06-28")
+    df = pd.DataFrame({"Close": range(len(index))}, index=index)
+    
+    trimmed = trim_to_period(df, "1y")
+    
+    assert trimmed.index[0] >= index[-1] - pd.DateOffset(years=1)
+    assert trimmed.index[-1] == index[-1]
+
+
+def test_incremental_update_keeps_window_length(cache_dir, monkeypatch):
+    cache_file = os.path.join(cache_dir, "AMZN_60d_1d.csv")
+    cached = pd.read_csv(cache_file, index_col=0, parse_dates=True)
+    
+    class NextBarTicker:
+        def __init__(self, ticker):
+            pass
+        
+        def history(self, **kwargs):
+            last = cached.iloc[-1:].copy()
+            next_bar = cached.iloc[-1:].copy()
+            next_bar.index = [cached.index[-1] + pd.Timedelta(days=1)]
+            return pd.concat([last, next_bar])
+    
+    monkeypatch.setattr(data_loader.yf, "Ticker", NextBarTicker)
+    stale = time.time() - 3 * 86400
+    os.utime(cache_file, (stale, stale))
+    
+    loader = DataLoader(["AMZN"], cache_dir=cache_dir)
+    df = loader._load_ticker_data("AMZN", "60d", "1d")
+    
+    assert len(df) == len(cached)
+    assert len(pd.read_csv(cache_file)) == len(cached)
+    assert loader.add_technical_indicators(df)["sma50"].notna().any()
@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from agents.ml_agent import ANALYSIS_COLUMNS, indicator_mask, technical_signals
+from data.data_loader import DataLoader
+from conftest import TICKERS
+
+
+def reference_technical_signals(df):
+    # The pandas implementation technical_signals replaced, kept as the spec
+    latest = df.iloc[-1]
+    signals = []
+    close = df['Close']
+    # Close.pct_change(5).iloc[-1], NaN until there are six rows
+    price_change = close.iloc[-1] / close.iloc[-6] - 1 if len(df) > 5 else np.nan
+    
+    has_sma = 'sma20' in df.columns and 'sma50' in df.columns
+    has_rsi = 'rsi14' in df.columns
+    has_macd = 'macd' in df.columns and 'macd_signal' in df.columns
+    has_bb = 'bb_low' in df.columns and 'bb_high' in df.columns
+    
+    if has_sma:
+        ma_cross = False
+        if len(df) > 2:
+            prev = df.iloc[-2]
+            if latest['sma20'] > latest['sma50'] and prev['sma20'] <= prev['sma50']:
+                signals.append(('buy', 0.75))
+                ma_cross = True
+            elif latest['sma20'] < latest['sma50'] and prev['sma20'] >= prev['sma50']:
+                signals.append(('sell', 0.75))
+                ma_cross = True
+        
+        if not ma_cross:
+            if latest['Close'] > latest['sma50'] and latest['sma20'] > latest['sma50']:
+                signals.append(('buy', 0.6))
+            elif latest['Close'] < latest['sma50'] and latest['sma20'] < latest['sma50']:
+                signals.append(('sell', 0.6))
+            elif latest['Close'] > latest['sma20']:
+                signals.append(('buy', 0.55))
+            else:
+                signals.append(('sell', 0.55))
+    elif len(df) > 5:
+        signals.append(('buy', 0.55) if price_change > 0 else ('sell', 0.55))
+    
+    if has_rsi:
+        rsi = latest['rsi14']
+        if rsi < 30:
+            signals.append(('buy', 0.7))
+        elif rsi > 70:
+            signals.append(('sell', 0.7))
+        elif rsi < 40:
+            signals.append(('buy', 0.6))
+        elif rsi > 60:
+            signals.append(('sell', 0.6))
+        elif rsi < 45:
+            signals.append(('buy', 0.55))
+        elif rsi > 55:
+            signals.append(('sell', 0.55))
+        else:
+            signals.append(('hold', 0.5))
+    
+    if has_macd:
+        macd_cross = False
+        if len(df) > 2:
+            prev = df.iloc[-2]
+            if latest['macd'] > latest['macd_signal'] and prev['macd'] <= prev['macd_signal']:
+                signals.append(('buy', 0.75))
+                macd_cross = True
+            elif latest['macd'] < latest['macd_signal'] and prev['macd'] >= prev['macd_signal']:
+                signals.append(('sell', 0.75))
+                macd_cross = True
+        
+        if not macd_cross:
+            if latest['macd'] > latest['macd_signal'] and latest['macd'] > 0:
+                signals.append(('buy', 0.65))
+            elif latest['macd'] < latest['macd_signal'] and latest['macd'] < 0:
+                signals.append(('sell', 0.65))
+            elif latest['macd'] > latest['macd_signal']:
+                signals.append(('buy', 0.55))
+            elif latest['macd'] < latest['macd_signal']:
+                signals.append(('sell', 0.55))
+            else:
+                signals.append(('hold', 0.5))
+    
+    if has_bb:
+        bb_pct = (latest['Close'] - latest['bb_low']) / (latest['bb_high'] - latest['bb_low'])
+        if latest['Close'] < latest['bb_low']:
+            signals.append(('buy', 0.7))
+        elif latest['Close'] > latest['bb_high']:
+            signals.append(('sell', 0.7))
+        elif bb_pct < 0.3:
+            signals.append(('buy', 0.6))
+        elif bb_pct > 0.7:
+            signals.append(('sell', 0.6))
+        elif bb_pct < 0.4:
+            signals.append(('buy', 0.55))
+        elif bb_pct > 0.6:
+            signals.append(('sell', 0.55))
+        else:
+            signals.append(('hold', 0.5))
+    
+    if len(df) >= 5:
+        if price_change > 0.03:
+            signals.append(('buy', 0.65))
+        elif price_change < -0.03:
+            signals.append(('sell', 0.65))
+        elif price_change > 0.01:
+            signals.append(('buy', 0.55))
+        elif price_change < -0.01:
+            signals.append(('sell', 0.55))
+        else:
+            signals.append(('hold', 0.5))
+    
+    buy_signals = [conf for action, conf in signals if action == 'buy']
+    sell_signals = [conf for action, conf in signals if action == 'sell']
+    hold_signals = [conf for action, conf in signals if action == 'hold']
+    
+    if len(signals) < 3 and len(df) >= 3:
+        if close.iloc[-1] > close.iloc[-3]:
+            buy_signals.append(0.55)
+        else:
+            sell_signals.append(0.55)
+    
+    if len(buy_signals) >= len(sell_signals) and len(buy_signals) >= len(hold_signals):
+        return 'buy', sum(buy_signals) / len(buy_signals) if buy_signals else 0.5
+    if len(sell_signals) >= len(buy_signals) and len(sell_signals) >= len(hold_signals):
+        return 'sell', sum(sell_signals) / len(sell_signals) if sell_signals else 0.5
+    return 'hold', sum(hold_signals) / len(hold_signals) if hold_signals else 0.5
+
+
+def assert_matches_reference(df, ends):
+    col_mask = indicator_mask(df.columns)
+    columns = {name: df[name].to_numpy() for name in df.columns}
+    for end in ends:
+        window = df.iloc[:end]
+        expected = reference_technical_signals(window)
+        actual = technical_signals({name: values[:end] for name, values in columns.items()}, col_mask, end)
+        assert actual[0] == expected[0], (df.index[end - 1], actual, expected)
+        assert actual[1] == pytest.approx(expected[1]), (df.index[end - 1], actual, expected)
+
+
+@pytest.mark.parametrize("ticker", TICKERS)
+def test_technical_signals_match_reference_on_cached_history(cache_dir, ticker):
+    loader = DataLoader([ticker], cache_dir=cache_dir)
+    raw = loader.download_historical_data(period="5y")[ticker]
+    df = loader.add_technical_indicators(raw, columns=ANALYSIS_COLUMNS)
+    
+    assert_matches_reference(df, range(1, len(df) + 1))
+
+
+def test_technical_signals_match_reference_without_indicators(cache_dir):
+    loader = DataLoader(["AMZN"], cache_dir=cache_dir)
+    raw = loader.download_historical_data(period="60d")["AMZN"]
+    
+    assert_matches_reference(raw[['Close']], range(1, len(raw) + 1))
+    assert_matches_reference(loader.add_technical_indicators(raw, columns=['Close', 'rsi14']),
+                             range(1, len(raw) + 1))